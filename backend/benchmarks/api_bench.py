@@ -0,0 +1,237 @@
+"""Benchmark: API endpoints in process, with CoinGecko and TaoStats served from fixtures.
+
+Run from backend/:  python -m benchmarks.api_bench [--json out.json] [--compare previous.json]
+
+Scenarios per endpoint:
+  cold      every request starts from empty caches, snapshots and history store
+  warm      caches primed once, then `--requests` requests at `--concurrency`
+  stampede  caches emptied, then `--concurrency` identical requests at once
+            (repeated `--rounds` times); `upstream` shows how many fetches they caused
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+from benchmarks import fixtures
+
+ENDPOINTS = {
+    "stats": "/api/stats",
+    "subnets": "/api/subnets",
+    "subnets_page": "/api/subnets?cat=Inference,Compute&sort=score&limit=20&fields=n,mc,score",
+    "valuation": "/api/valuation?rate=0.3&years=10",
+    "history_tao_30d": "/api/historical/tao?days=30",
+    "history_btc_365d": "/api/historical/btc?days=365",
+}
+SCENARIOS = ("cold", "warm", "stampede")
+
+
+class Upstream:
+    """Mock transport answering from fixtures after a fixed delay; counts requests."""
+
+    def __init__(self, latency_ms, tokens):
+        self.latency = latency_ms / 1000
+        self.tokens = tokens
+        self.calls = 0
+
+    async def handle(self, request):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        status, payload = fixtures.respond(request.url.path, dict(request.url.params), self.tokens)
+        return httpx.Response(status, json=payload)
+
+
+class Bench:
+    def __init__(self, main, upstream, workdir):
+        self.main = main
+        self.upstream = upstream
+        self.workdir = workdir
+        self._resets = 0
+
+    def reset(self):
+        """Drops everything a worker would have cached: TTL cache, disk snapshots,
+        merged snapshot, encoded bodies and the local history store."""
+        from deltas import DeltaLog
+        from responses import EncodedCache
+        from snapshot import SnapshotStore
+        from timeseries import TimeSeriesStore
+
+        m = self.main
+        self._resets += 1
+        run_dir = os.path.join(self.workdir, str(self._resets))
+        m._cache.clear()
+        m.snapshots = SnapshotStore(os.path.join(run_dir, "snapshots"))
+        m._subnet_snapshot = None
+        m.encoded = EncodedCache()
+        m.query_results = EncodedCache(max_entries=256)
+        m.history_responses = EncodedCache(max_entries=64)
+        m.deltas = DeltaLog()
+        m.history.close()
+        os.makedirs(run_dir, exist_ok=True)
+        m.history = TimeSeriesStore(os.path.join(run_dir, "history.sqlite3"))
+        m._backfilled_from.clear()
+        m._backfill_retry_at.clear()
+
+    async def timed(self, client, path, latencies, errors):
+        start = time.perf_counter()
+        try:
+            resp = await client.get(path)
+            if resp.status_code != 200:
+                errors.append(resp.status_code)
+        except Exception as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - start)
+
+    async def cold(self, client, path, n):
+        latencies, errors = [], []
+        wall = 0.0
+        for _ in range(n):
+            self.reset()
+            start = time.perf_counter()
+            await self.timed(client, path, latencies, errors)
+            wall += time.perf_counter() - start
+        return latencies, errors, wall
+
+    async def warm(self, client, path, n, concurrency):
+        self.reset()
+        await client.get(path)
+        latencies, errors = [], []
+        remaining = iter(range(n))
+
+        async def worker():
+            for _ in remaining:
+                await self.timed(client, path, latencies, errors)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return latencies, errors, time.perf_counter() - start
+
+    async def stampede(self, client, path, rounds, concurrency):
+        latencies, errors = [], []
+        wall = 0.0
+        for _ in range(rounds):
+            self.reset()
+            start = time.perf_counter()
+            await asyncio.gather(*(self.timed(client, path, latencies, errors) for _ in range(concurrency)))
+            wall += time.perf_counter() - start
+        return latencies, errors, wall
+
+
+def summarize(endpoint, scenario, latencies, errors, wall, upstream_calls, concurrency):
+    ms = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "endpoint": endpoint,
+        "scenario": scenario,
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "upstream": upstream_calls,
+        "rps": round(len(latencies) / wall, 1) if wall else None,
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+async def run(args):
+    workdir = tempfile.mkdtemp(prefix="deai-bench-")
+    os.environ.update(
+        WEB_CONCURRENCY="1",
+        COINGECKO_RATE_PER_MIN="1000000",
+        TAOSTATS_RATE_PER_MIN="1000000",
+        SNAPSHOT_DIR=os.path.join(workdir, "snapshots"),
+        TIMESERIES_DB=os.path.join(workdir, "history.sqlite3"),
+    )
+    if args.taostats:
+        os.environ["TAOSTATS_API_KEY"] = "bench"
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with quiet:
+        import main
+
+    upstream = Upstream(args.upstream_ms, args.tokens)
+    main.pool.transport = httpx.MockTransport(upstream.handle)
+    bench = Bench(main, upstream, workdir)
+    results = []
+    transport = httpx.ASGITransport(app=main.app)
+    try:
+        main.pool.open()
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            for endpoint in args.only or ENDPOINTS:
+                path = ENDPOINTS[endpoint]
+                for scenario in SCENARIOS:
+                    calls = upstream.calls
+                    with quiet:
+                        if scenario == "cold":
+                            out, concurrency = await bench.cold(client, path, args.cold), 1
+                        elif scenario == "warm":
+                            out, concurrency = await bench.warm(client, path, args.requests, args.concurrency), args.concurrency
+                        else:
+                            out, concurrency = await bench.stampede(client, path, args.rounds, args.concurrency), args.concurrency
+                    results.append(summarize(endpoint, scenario, *out, upstream.calls - calls, concurrency))
+    finally:
+        await main.pool.close()
+        main.history.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def print_results(results, previous=None):
+    before = {(r["endpoint"], r["scenario"]): r for r in previous or []}
+    print(f"{'endpoint':<18} {'scenario':<9} {'n':>5} {'err':>4} {'up':>5} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for r in results:
+        line = (
+            f"{r['endpoint']:<18} {r['scenario']:<9} {r['requests']:>5} {r['errors']:>4} {r['upstream']:>5} "
+            f"{r['rps'] or 0:>9.1f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f}"
+        )
+        old = before.get((r["endpoint"], r["scenario"]))
+        if old:
+            change = lambda k: (r[k] / old[k] - 1) * 100 if old[k] else 0.0
+            line += f"   p50 {change('p50_ms'):+.0f}%  p95 {change('p95_ms'):+.0f}%  p99 {change('p99_ms'):+.0f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="previous --json output to compare against")
+    parser.add_argument("--only", nargs="+", choices=list(ENDPOINTS), help="endpoints to run")
+    parser.add_argument("--requests", type=int, default=500, help="warm requests per endpoint")
+    parser.add_argument("--cold", type=int, default=10, help="cold requests per endpoint")
+    parser.add_argument("--rounds", type=int, default=5, help="stampede rounds per endpoint")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--upstream-ms", type=float, default=80, help="simulated upstream latency")
+    parser.add_argument("--tokens", type=int, default=fixtures.TOKENS, help="alpha tokens listed upstream")
+    parser.add_argument("--taostats", action="store_true", help="also fetch TaoStats (as with an API key)")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's log output")
+    args = parser.parse_args()
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)["results"]
+
+    results = asyncio.run(run(args))
+    print_results(results, previous)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "params": {k: v for k, v in vars(args).items() if k not in ("json", "compare")},
+                "results": results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Upstream payloads in CoinGecko and TaoStats response shapes.
+
+Used by the API benchmark (served through an in-process mock transport) and
+by the local simulator. Payloads are generated deterministically instead of
+being checked-in recordings, so any token count or history span can be
+produced; prices are smooth functions of time, so repeated fetches see small
+changes the way live data does.
+"""
+import math
+import time
+
+TOKENS = 128          # bittensor-ecosystem alpha tokens listed on CoinGecko
+LISTED_AT = 1_680_000_000  # first TAO price point (epoch s) for days=max
+
+
+def tao_usd(t):
+    return 300 + 40 * math.sin(t / (7 * 86400)) + 6 * math.sin(t / (5 * 3600))
+
+
+def tao_btc(t):
+    return tao_usd(t) / (60_000 + 5_000 * math.sin(t / (11 * 86400)))
+
+
+PRICE = {"usd": tao_usd, "btc": tao_btc}
+
+
+def simple_price(now=None):
+    now = time.time() if now is None else now
+    usd = tao_usd(now)
+    return {
+        "bittensor": {
+            "usd": round(usd, 2),
+            "btc": round(tao_btc(now), 8),
+            "usd_market_cap": usd * 8_600_000,
+            "usd_24h_vol": 95_000_000 + 10_000_000 * math.sin(now / 3600),
+            "usd_24h_change": round(100 * (usd / tao_usd(now - 86400) - 1), 4),
+        }
+    }
+
+
+def _token(netuid, now):
+    base = 40.0 / netuid
+    drift = 1 + 0.02 * math.sin(now / 600 + netuid)  # moves a little every refresh
+    price = base * drift
+    supply = 2_000_000 + 37_000 * netuid
+    return {
+        "id": f"subnet-{netuid}-alpha",
+        "symbol": f"sn{netuid}",
+        "name": f"Subnet {netuid} Alpha" if netuid % 4 else f"Subnet {netuid}",
+        "image": f"https://assets.example/coins/sn{netuid}.png",
+        "current_price": round(price, 6),
+        "market_cap": round(price * supply, 2),
+        "total_volume": round(price * supply * 0.03, 2),
+        "circulating_supply": supply,
+        "price_change_percentage_24h_in_currency": round(4 * math.sin(now / 86400 + netuid), 4),
+        "price_change_percentage_7d_in_currency": round(9 * math.cos(now / 604800 + netuid), 4),
+    }
+
+
+def markets(page, per_page, tokens=TOKENS, now=None):
+    """One page of /coins/markets?category=bittensor-ecosystem."""
+    now = time.time() if now is None else now
+    first = (page - 1) * per_page + 1
+    return [_token(netuid, now) for netuid in range(first, min(first + per_page, tokens + 1))]
+
+
+def market_chart_range(vs, start, end):
+    """/coins/bittensor/market_chart/range: hourly points up to 90 days, daily beyond."""
+    step = 3600 if end - start <= 90 * 86400 else 86400
+    price = PRICE[vs]
+    ts = range(int(start) - int(start) % step + step, int(end) + 1, step)
+    prices = [[t * 1000, price(t)] for t in ts]
+    return {
+        "prices": prices,
+        "market_caps": [[t, p * 8_600_000] for t, p in prices],
+        "total_volumes": [[t, 95_000_000.0] for t, _ in prices],
+    }
+
+
+def market_chart(vs, days, now=None):
+    """/coins/bittensor/market_chart?days=N (or 'max')."""
+    now = time.time() if now is None else now
+    start = LISTED_AT if days == "max" else now - float(days) * 86400
+    return market_chart_range(vs, start, now)
+
+
+def taostats_subnets(limit=256, tokens=TOKENS, now=None):
+    """TaoStats /subnet/latest/v1."""
+    now = time.time() if now is None else now
+    weights = [1 / n for n in range(1, tokens + 1)]
+    total = sum(weights)
+    data = []
+    for netuid, w in enumerate(weights[:limit], start=1):
+        share = w / total
+        data.append({
+            "netuid": netuid,
+            "name": f"Subnet {netuid}",
+            "emission": 7200 * share,
+            "emission_pct": share,
+            "validator_count": 64 - netuid % 16,
+            "miner_count": 192 + netuid % 64,
+            "alpha_price_tao": round(_token(netuid, now)["current_price"] / tao_usd(now), 6),
+        })
+    return {"data": data}
+
+
+def respond(path, params, tokens=TOKENS):
+    """(status, payload) for an upstream request path and its query params."""
+    if path.endswith("/simple/price"):
+        return 200, simple_price()
+    if path.endswith("/coins/markets"):
+        return 200, markets(int(params.get("page", 1)), int(params.get("per_page", 100)), tokens)
+    if path.endswith("/market_chart/range"):
+        return 200, market_chart_range(params.get("vs_currency", "usd"), float(params["from"]), float(params["to"]))
+    if path.endswith("/market_chart"):
+        return 200, market_chart(params.get("vs_currency", "usd"), params.get("days", "30"))
+    if path.endswith("/subnet/latest/v1"):
+        return 200, taostats_subnets(int(params.get("limit", 256)), tokens)
+    return 404, {"error": "not found"}
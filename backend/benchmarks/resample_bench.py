@@ -0,0 +1,90 @@
+"""Benchmark: per-point history formatting loop vs. the NumPy resampling layer.
+
+Run from backend/:  python -m benchmarks.resample_bench [--json out.json]
+"""
+import argparse
+import json
+import time
+import timeit
+from datetime import datetime
+
+import numpy as np
+
+from resample import downsample, to_arrays, to_rows
+
+HOUR_MS = 3_600_000
+DAY_MS = 86_400_000
+
+SERIES = {
+    "365d": 365 * 24,     # one year of hourly points
+    "max": 1300 * 24,     # full TAO listing history at hourly resolution
+}
+
+
+def make_points(n):
+    rng = np.random.default_rng(0)
+    end = int(time.time() * 1000) // HOUR_MS * HOUR_MS
+    ts = end - HOUR_MS * np.arange(n)[::-1]
+    values = 300 + np.cumsum(rng.normal(0, 2, n))
+    return [[int(t), float(v)] for t, v in zip(ts, values)]
+
+
+def current_loop(points):
+    """What the history handlers did per request before the resampling layer."""
+    return [
+        {
+            "date": datetime.fromtimestamp(p[0] / 1000).strftime("%b %d"),
+            "value": round(p[1], 4),
+            "timestamp": p[0],
+        }
+        for p in points
+    ]
+
+
+def resampled(points, interval_ms, agg, max_points):
+    ts, values = to_arrays(points)
+    out = downsample(ts, values, interval_ms, agg, max_points)
+    return to_rows(out, "%b %d", decimals=4, with_timestamp=True)
+
+
+CASES = {
+    "loop (all points)": lambda pts: current_loop(pts),
+    "daily last": lambda pts: resampled(pts, DAY_MS, "last", 1000),
+    "hourly lttb 500": lambda pts: resampled(pts, HOUR_MS, "last", 500),
+    "daily ohlc": lambda pts: resampled(pts, DAY_MS, "ohlc", 1000),
+}
+
+
+def run(repeat=7):
+    results = []
+    for name, n in SERIES.items():
+        points = make_points(n)
+        for case, fn in CASES.items():
+            number = 5
+            best = min(timeit.repeat(lambda: fn(points), number=number, repeat=repeat)) / number
+            results.append({
+                "series": name,
+                "input_points": n,
+                "case": case,
+                "output_points": len(fn(points)),
+                "ms": round(best * 1000, 3),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = run()
+    print(f"{'series':<6} {'case':<20} {'in':>7} {'out':>6} {'ms':>9}")
+    for r in results:
+        print(f"{r['series']:<6} {r['case']:<20} {r['input_points']:>7} {r['output_points']:>6} {r['ms']:>9.3f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Local stand-in for CoinGecko and TaoStats, for load and failure testing.
+
+Run from backend/:  python -m benchmarks.simulator [--port 8900] [options]
+
+and point the API at it:
+
+    COINGECKO_BASE=http://127.0.0.1:8900/coingecko/api/v3 \\
+    TAOSTATS_BASE=http://127.0.0.1:8900/taostats/api TAOSTATS_API_KEY=sim \\
+    uvicorn main:app
+
+Serves /simple/price, /coins/markets, /coins/bittensor/market_chart[/range] and
+TaoStats /subnet/latest/v1 from benchmarks/fixtures.py. Latency, error rate,
+hangs, 429 bursts, token count and page size are set on the command line and
+can be changed while it runs: POST /_sim/config with the same option names as
+JSON (e.g. {"error_rate": 1, "target": "coingecko"} to exercise the fallbacks).
+GET /_sim/stats returns request counts by provider and status.
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+
+import orjson
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request, Response
+
+from benchmarks import fixtures
+
+PROVIDERS = ("coingecko", "taostats")
+ERROR_STATUSES = (500, 502, 503)
+
+
+def parse_latency(spec):
+    """'80' or 'fixed:80', 'uniform:20:200', 'lognormal:80:0.6' (median ms, sigma)
+    -> function returning a delay in seconds."""
+    kind, *nums = str(spec).split(":") if ":" in str(spec) else ("fixed", spec)
+    try:
+        nums = [float(n) for n in nums]
+        if kind == "fixed" and len(nums) == 1:
+            return lambda: nums[0] / 1000
+        if kind == "uniform" and len(nums) == 2:
+            return lambda: random.uniform(nums[0], nums[1]) / 1000
+        if kind == "lognormal" and len(nums) == 2:
+            return lambda: random.lognormvariate(0, nums[1]) * nums[0] / 1000
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid latency {spec!r}; use e.g. 80, uniform:20:200 or lognormal:80:0.6")
+
+
+class Config:
+    FIELDS = {
+        "latency": str, "error_rate": float, "hang_rate": float, "hang_seconds": float,
+        "burst_every": float, "burst_for": float, "retry_after": int,
+        "tokens": int, "page_size": int, "target": str,
+    }
+
+    def __init__(self, **options):
+        self.latency = "50"
+        self.error_rate = 0.0      # fraction of requests answered with 500/502/503
+        self.hang_rate = 0.0       # fraction held for hang_seconds, then 504
+        self.hang_seconds = 30.0
+        self.burst_every = 0.0     # every N seconds ...
+        self.burst_for = 0.0       # ... answer 429 for this many seconds
+        self.retry_after = 5
+        self.tokens = fixtures.TOKENS
+        self.page_size = 250       # max per_page honoured by /coins/markets
+        self.target = "all"        # provider that faults apply to: all, coingecko, taostats
+        self.started = time.monotonic()
+        self.update(options)
+
+    def update(self, options):
+        """Applies all of `options` or, if any is invalid, none of them."""
+        if not isinstance(options, dict):
+            raise ValueError("Config must be a JSON object")
+        values = {}
+        for name, value in options.items():
+            if name not in self.FIELDS:
+                raise ValueError(f"Unknown option {name!r}")
+            try:
+                values[name] = self.FIELDS[name](value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid value for {name}: {value!r}")
+        target = values.get("target", self.target)
+        if target not in ("all", *PROVIDERS):
+            raise ValueError("target must be all, coingecko or taostats")
+        delay = parse_latency(values.get("latency", self.latency))
+        for name, value in values.items():
+            setattr(self, name, value)
+        self.delay = delay
+
+    def in_burst(self):
+        if self.burst_every <= 0 or self.burst_for <= 0:
+            return False
+        return (time.monotonic() - self.started) % self.burst_every < self.burst_for
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+
+def create_app(config):
+    app = FastAPI(title="Upstream simulator")
+    counts = Counter()
+
+    @app.get("/_sim/stats")
+    async def sim_stats():
+        return {f"{provider} {status}": n for (provider, status), n in sorted(counts.items())}
+
+    @app.get("/_sim/config")
+    async def get_config():
+        return config.as_dict()
+
+    @app.post("/_sim/config")
+    async def set_config(request: Request):
+        try:
+            config.update(await request.json())
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return config.as_dict()
+
+    @app.get("/{provider}/{path:path}")
+    async def upstream(provider: str, path: str, request: Request):
+        if provider not in PROVIDERS:
+            raise HTTPException(status_code=404)
+        status, payload, headers = await answer(provider, path, dict(request.query_params))
+        counts[provider, status] += 1
+        return Response(orjson.dumps(payload), status_code=status, media_type="application/json", headers=headers)
+
+    async def answer(provider, path, params):
+        await asyncio.sleep(config.delay())
+        if config.target in ("all", provider):
+            if config.in_burst():
+                return 429, {"error": "rate limited"}, {"Retry-After": str(config.retry_after)}
+            roll = random.random()
+            if roll < config.hang_rate:
+                await asyncio.sleep(config.hang_seconds)
+                return 504, {"error": "gateway timeout"}, {}
+            if roll < config.hang_rate + config.error_rate:
+                return random.choice(ERROR_STATUSES), {"error": "simulated failure"}, {}
+        if path.endswith("coins/markets"):
+            params["per_page"] = min(int(params.get("per_page", 100)), config.page_size)
+        status, payload = fixtures.respond("/" + path, params, config.tokens)
+        return status, payload, {}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", default="50", help="80, uniform:20:200 or lognormal:80:0.6 (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    parser.add_argument("--hang-seconds", type=float, default=30.0)
+    parser.add_argument("--burst-every", type=float, default=0.0, help="start a 429 burst every N seconds")
+    parser.add_argument("--burst-for", type=float, default=0.0, help="length of each 429 burst in seconds")
+    parser.add_argument("--retry-after", type=int, default=5)
+    parser.add_argument("--tokens", type=int, default=fixtures.TOKENS, help="alpha tokens listed")
+    parser.add_argument("--page-size", type=int, default=250, help="max per_page for /coins/markets")
+    parser.add_argument("--target", default="all", choices=("all", *PROVIDERS), help="provider faults apply to")
+    parser.add_argument("--seed", type=int, help="seed for latency and fault rolls")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    options = {k: v for k, v in vars(args).items() if k in Config.FIELDS}
+    uvicorn.run(create_app(Config(**options)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Benchmark: worker start-up, from a fresh interpreter to the first served request.
+
+Run from backend/:  python -m benchmarks.startup_bench [--runs 5] [--gunicorn]
+
+  import     `import main` in a new process (-X importtime), with the modules
+             main pulls in ranked by cumulative import time
+  phases     in a new process: import, lifespan startup, first /api/health and
+             first /api/subnets (upstreams served from fixtures)
+  gunicorn   (--gunicorn) a real server with and without preload: time until
+             it answers, each worker's fork-to-ready time, and the same for a
+             worker added afterwards (SIGTTIN), which is what recycling costs
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import re
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+READY_LINE = re.compile(r"Worker (\d+) ready ([\d.]+)s after fork")
+
+
+def app_env(workdir):
+    """Environment for a throwaway app instance; upstreams point at a closed port
+    so background refreshes fail fast instead of reaching the internet."""
+    return {
+        **os.environ,
+        "PYTHONUNBUFFERED": "1",
+        "WEB_CONCURRENCY": "1",
+        "COINGECKO_RATE_PER_MIN": "1000000",
+        "TAOSTATS_RATE_PER_MIN": "1000000",
+        "COINGECKO_BASE": "http://127.0.0.1:9/api/v3",
+        "TAOSTATS_BASE": "http://127.0.0.1:9/api",
+        "SNAPSHOT_DIR": os.path.join(workdir, "snapshots"),
+        "TIMESERIES_DB": os.path.join(workdir, "history.sqlite3"),
+        "PROMETHEUS_MULTIPROC_DIR": os.path.join(workdir, "metrics"),
+    }
+
+
+def import_report(runs, top, env):
+    totals, modules = [], {}
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            cwd=BACKEND, env=env, capture_output=True, text=True, check=True,
+        ).stderr
+        for line in out.splitlines():
+            m = IMPORT_LINE.match(line)
+            if not m:
+                continue
+            self_us, cumulative, indent, name = int(m[1]), int(m[2]), len(m[3]), m[4]
+            if indent == 0 and name == "main":
+                totals.append(cumulative / 1e6)
+                modules.setdefault("main (own code)", []).append(self_us / 1e6)
+            elif indent == 2:
+                modules.setdefault(name, []).append(cumulative / 1e6)
+    ranked = sorted(((statistics.median(v), k) for k, v in modules.items()), reverse=True)
+    return {"total_s": statistics.median(totals), "modules": [{"module": k, "s": s} for s, k in ranked[:top]]}
+
+
+async def child_phases(upstream_ms):
+    """Runs inside the child process started by phase_report()."""
+    timings = {}
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main
+    timings["import_s"] = time.perf_counter() - start
+
+    import httpx
+    from benchmarks.api_bench import Upstream
+
+    main.pool.transport = httpx.MockTransport(Upstream(upstream_ms, 128).handle)
+    with contextlib.redirect_stdout(io.StringIO()):
+        mark = time.perf_counter()
+        async with main.app.router.lifespan_context(main.app):
+            timings["lifespan_s"] = time.perf_counter() - mark
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+                for name, path in (("first_health_s", "/api/health"), ("first_subnets_s", "/api/subnets")):
+                    mark = time.perf_counter()
+                    (await client.get(path)).raise_for_status()
+                    timings[name] = time.perf_counter() - mark
+    timings["ready_to_serve_s"] = timings["import_s"] + timings["lifespan_s"] + timings["first_health_s"]
+    return timings
+
+
+def phase_report(runs, upstream_ms, env):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.startup_bench", "--child", "--upstream-ms", str(upstream_ms)],
+            cwd=BACKEND, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        samples.append(json.loads(out.strip().splitlines()[-1]))
+    return {k: statistics.median(s[k] for s in samples) for k in samples[0]}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url, deadline):
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as resp:
+                if resp.status == 200:
+                    return True
+        except OSError:
+            time.sleep(0.02)
+    return False
+
+
+def gunicorn_report(workers, preload, env, timeout=60):
+    port = free_port()
+    env = {**env, "GUNICORN_PRELOAD": "1" if preload else "0", "WEB_CONCURRENCY": str(workers)}
+    log = tempfile.TemporaryFile(mode="w+")
+    start = time.monotonic()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+         "-k", "uvicorn.workers.UvicornWorker", "-b", f"127.0.0.1:{port}", "main:app"],
+        cwd=BACKEND, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+    def ready_times():
+        log.seek(0)
+        return [float(m[2]) for m in READY_LINE.finditer(log.read())]
+
+    def wait_ready(count):
+        deadline = time.monotonic() + timeout
+        while len(ready_times()) < count and time.monotonic() < deadline:
+            time.sleep(0.02)
+        return ready_times()
+
+    try:
+        if not wait_for(f"http://127.0.0.1:{port}/api/health", start + timeout):
+            log.seek(0)
+            raise RuntimeError(f"gunicorn did not answer within {timeout}s:\n{log.read()[-2000:]}")
+        first_response = time.monotonic() - start
+        boot = wait_ready(workers)
+        proc.send_signal(signal.SIGTTIN)  # one more worker, forked from the running master
+        added = wait_ready(workers + 1)[workers:]
+        return {
+            "preload": preload,
+            "first_response_s": first_response,
+            "worker_ready_s": statistics.median(boot) if boot else None,
+            "added_worker_ready_s": added[0] if added else None,
+        }
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        log.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per measurement")
+    parser.add_argument("--top", type=int, default=12, help="modules listed in the import report")
+    parser.add_argument("--upstream-ms", type=float, default=80, help="simulated upstream latency")
+    parser.add_argument("--gunicorn", action="store_true", help="also start gunicorn with and without preload")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(child_phases(args.upstream_ms))))
+        return
+
+    workdir = tempfile.mkdtemp(prefix="deai-startup-")
+    try:
+        env = app_env(workdir)
+        os.makedirs(env["PROMETHEUS_MULTIPROC_DIR"])
+        results = {"import": import_report(args.runs, args.top, env), "phases": phase_report(args.runs, args.upstream_ms, env)}
+        if args.gunicorn:
+            results["gunicorn"] = [gunicorn_report(args.workers, preload, env) for preload in (True, False)]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"import main: {results['import']['total_s'] * 1000:.0f} ms (median of {args.runs})")
+    for row in results["import"]["modules"]:
+        print(f"  {row['module']:<28} {row['s'] * 1000:>8.1f} ms")
+    print("\nfresh process (median):")
+    for name, s in results["phases"].items():
+        print(f"  {name:<28} {s * 1000:>8.1f} ms")
+    for row in results.get("gunicorn", []):
+        fmt = lambda s: f"{s * 1000:.0f} ms" if s is not None else "n/a"
+        print(
+            f"\ngunicorn -w {args.workers} preload={'on' if row['preload'] else 'off'}: first response "
+            f"{fmt(row['first_response_s'])}, worker ready after fork {fmt(row['worker_ready_s'])}, "
+            f"added worker {fmt(row['added_worker_ready_s'])}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Bounded in-process TTL cache with LRU eviction and memory accounting.
+
+Expiry runs on the monotonic clock, so wall-clock jumps do not affect it.
+Expired entries are kept (up to `stale_ttl`) so callers can still serve the
+last known value while it is being refreshed.
+"""
+import sys
+import time
+from collections import OrderedDict
+
+
+def sizeof(obj, _seen=None):
+    """Approximate deep size of a JSON-like value in bytes."""
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(sizeof(k, _seen) + sizeof(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(sizeof(v, _seen) for v in obj)
+    return size
+
+
+class TTLCache:
+    def __init__(self, max_entries=512, max_bytes=64 * 1024 * 1024, stale_ttl=86400, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stale_ttl = stale_ttl
+        self.clock = clock
+        self._data = OrderedDict()  # key -> (value, stored_at, expires_at, size)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def _entry(self, key):
+        entry = self._data.get(key)
+        if entry is not None and self.clock() - entry[2] > self.stale_ttl:
+            self._drop(key)
+            return None
+        return entry
+
+    def get(self, key):
+        """Returns the value for `key` if it has not expired, else None."""
+        entry = self._entry(key)
+        if entry is None or self.clock() >= entry[2]:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def lookup(self, key, stale_ok=True):
+        """(value, fresh) for `key`, counting exactly one hit, stale hit or miss.
+        An expired value is returned with fresh=False if `stale_ok`, else counts
+        as a miss; (None, False) when there is nothing usable."""
+        entry = self._entry(key)
+        if entry is None or (not stale_ok and self.clock() >= entry[2]):
+            self.misses += 1
+            return None, False
+        self._data.move_to_end(key)
+        if self.clock() >= entry[2]:
+            self.stale_hits += 1
+            return entry[0], False
+        self.hits += 1
+        return entry[0], True
+
+    def set(self, key, value, ttl):
+        if key in self._data:
+            self._drop(key)
+        now = self.clock()
+        size = sizeof(value)
+        self._data[key] = (value, now, now + ttl, size)
+        self.bytes += size
+        while len(self._data) > 1 and (len(self._data) > self.max_entries or self.bytes > self.max_bytes):
+            self._drop(next(iter(self._data)))
+            self.evictions += 1
+
+    def _drop(self, key):
+        entry = self._data.pop(key)
+        self.bytes -= entry[3]
+
+    def clear(self):
+        self._data.clear()
+        self.bytes = 0
+
+    def stats(self):
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "evictions": self.evictions,
+        }
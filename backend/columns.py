@@ -0,0 +1,155 @@
+"""Columnar subnet table: one NumPy array per numeric field, keyed by netuid.
+
+Strings that repeat (`cat`, `trend`) are interned as categoricals. Each row
+also carries a schema id: the key order of that row's JSON record, so
+`to_records` reproduces the list-of-dicts shape (fields a row never had are
+left out rather than emitted as defaults).
+"""
+import numpy as np
+
+CATEGORICAL_FIELDS = ("cat", "trend")
+TEXT_FIELDS = ("n", "cg_image")
+FLAG_FIELDS = ("live", "authenticated")
+
+
+class Categorical:
+    """Interned strings: `codes[i]` indexes into `categories`."""
+
+    __slots__ = ("categories", "codes")
+
+    def __init__(self, categories, codes):
+        self.categories = tuple(categories)
+        self.codes = codes
+
+    @classmethod
+    def from_values(cls, values):
+        categories = sorted(set(values))
+        lookup = {c: i for i, c in enumerate(categories)}
+        codes = np.fromiter((lookup[v] for v in values), dtype=np.int32, count=len(values))
+        return cls(categories, codes)
+
+    def code(self, value):
+        """Code for `value`, or -1 if no row has it."""
+        try:
+            return self.categories.index(value)
+        except ValueError:
+            return -1
+
+    def mask(self, value):
+        return self.codes == self.code(value)
+
+    def take(self, rows):
+        return Categorical(self.categories, self.codes[rows])
+
+    def tolist(self):
+        return np.array(self.categories, dtype=object)[self.codes].tolist()
+
+
+class SubnetColumns:
+    """Immutable subnet table. Row i of every column describes subnet `ids[i]`."""
+
+    __slots__ = ("ids", "numeric", "categorical", "text", "flags", "schema_ids", "schemas", "_index", "_lists")
+
+    def __init__(self, ids, numeric, categorical, text, flags, schema_ids, schemas):
+        self.ids = ids
+        self.numeric = numeric            # field -> float64/int64 array
+        self.categorical = categorical    # field -> Categorical
+        self.text = text                  # field -> list (names, urls, anything non-numeric)
+        self.flags = flags                # field -> bool array
+        self.schema_ids = schema_ids      # row -> index into schemas
+        self.schemas = schemas            # list of key tuples
+        self._index = None
+        self._lists = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_records(cls, records, float_fields=()):
+        """Builds columns from uniform-ish dicts. Numeric fields are int64 when every
+        value is an int (unless listed in `float_fields`), else float64."""
+        schemas, schema_lookup, schema_ids = [], {}, []
+        fields = {}
+        for r in records:
+            keys = tuple(r)
+            if keys not in schema_lookup:
+                schema_lookup[keys] = len(schemas)
+                schemas.append(keys)
+            schema_ids.append(schema_lookup[keys])
+            for k in keys:
+                fields.setdefault(k, None)
+
+        n = len(records)
+        numeric, categorical, text, flags = {}, {}, {}, {}
+        for field in fields:
+            values = [r.get(field) for r in records]
+            if field in CATEGORICAL_FIELDS:
+                categorical[field] = Categorical.from_values([v or "" for v in values])
+            elif field in TEXT_FIELDS:
+                text[field] = [v or "" for v in values]
+            elif field in FLAG_FIELDS:
+                flags[field] = np.array([bool(v) for v in values], dtype=bool)
+            elif all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values if v is not None):
+                is_int = field not in float_fields and all(isinstance(v, int) for v in values if v is not None)
+                dtype = np.int64 if is_int else np.float64
+                numeric[field] = np.array([0 if v is None else v for v in values], dtype=dtype)
+            else:
+                text[field] = values
+        ids = numeric.pop("id").astype(np.int64) if n else np.empty(0, dtype=np.int64)
+        return cls(ids, numeric, categorical, text, flags, np.array(schema_ids, dtype=np.int32), schemas)
+
+    @property
+    def index(self):
+        """netuid -> row."""
+        if self._index is None:
+            self._index = {nid: i for i, nid in enumerate(self.ids.tolist())}
+        return self._index
+
+    def column(self, field):
+        if field == "id":
+            return self.ids
+        if field in self.numeric:
+            return self.numeric[field]
+        if field in self.flags:
+            return self.flags[field]
+        raise KeyError(field)
+
+    def take(self, rows):
+        """New table with the given rows, in that order."""
+        rows = np.asarray(rows, dtype=np.int64)
+        row_list = rows.tolist()
+        return SubnetColumns(
+            self.ids[rows],
+            {k: v[rows] for k, v in self.numeric.items()},
+            {k: v.take(rows) for k, v in self.categorical.items()},
+            {k: [v[i] for i in row_list] for k, v in self.text.items()},
+            {k: v[rows] for k, v in self.flags.items()},
+            self.schema_ids[rows],
+            self.schemas,
+        )
+
+    def _as_lists(self):
+        if self._lists is None:
+            lists = {"id": self.ids.tolist()}
+            lists.update((k, v.tolist()) for k, v in self.numeric.items())
+            lists.update((k, v.tolist()) for k, v in self.categorical.items())
+            lists.update(self.text)
+            lists.update((k, v.tolist()) for k, v in self.flags.items())
+            self._lists = lists
+        return self._lists
+
+    def to_records(self, rows=None, fields=None):
+        """Rows as dicts in their original key order (optionally only `fields`)."""
+        lists = self._as_lists()
+        schemas = self.schemas
+        if fields is not None:
+            wanted = set(fields)
+            schemas = [tuple(k for k in s if k in wanted) for s in schemas]
+        schema_ids = self.schema_ids.tolist()
+        if rows is None:
+            rows = range(len(self.ids))
+        out = []
+        for i in rows:
+            keys = schemas[schema_ids[i]]
+            out.append(dict(zip(keys, [lists[k][i] for k in keys])))
+        return out
@@ -0,0 +1,67 @@
+"""Deltas between subnet snapshot versions, for `/api/subnets?since=<version>`.
+
+Each worker keeps its last few snapshot versions. The diff from a retained
+version to the latest one is computed the first time it is asked for and then
+reused until the next version is pushed, so a rebuild costs no diffing and
+repeated polls from the same version are a dict lookup. A version that has fallen out of the buffer (or was built by another
+worker from different upstream data) gets a full reset instead.
+"""
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+def diff_records(old, new):
+    """old/new: {netuid: record}. Returns {"added", "removed", "changed"}; changed
+    items carry only the fields that differ ("set") and keys that disappeared ("unset")."""
+    added = [r for nid, r in new.items() if nid not in old]
+    removed = [nid for nid in old if nid not in new]
+    changed = []
+    for nid, r in new.items():
+        prev = old.get(nid)
+        if prev is None or prev is r:
+            continue
+        fields = {k: v for k, v in r.items() if prev.get(k, _MISSING) != v}
+        unset = [k for k in prev if k not in r]
+        if fields or unset:
+            item = {"id": nid, "set": fields}
+            if unset:
+                item["unset"] = unset
+            changed.append(item)
+    return {"added": added, "removed": removed, "changed": changed}
+
+
+class DeltaLog:
+    def __init__(self, max_versions=16):
+        self.max_versions = max_versions
+        self.latest = None
+        self._versions = OrderedDict()  # version -> {netuid: record}
+        self._diffs = {}                # older version -> diff to latest, filled on demand
+        self._order = []                # netuids of latest, in list order
+
+    def push(self, version, records):
+        if version == self.latest:
+            return
+        by_id = {r["id"]: r for r in records}
+        self._diffs = {}
+        self._versions[version] = by_id
+        while len(self._versions) > self.max_versions:
+            self._versions.popitem(last=False)
+        self._order = list(by_id)
+        self.latest = version
+
+    def since(self, version):
+        """Delta from `version` to the latest version, or None if it is unknown."""
+        if version == self.latest:
+            delta = {"added": [], "removed": [], "changed": []}
+        else:
+            delta = self._diffs.get(version)
+            if delta is None:
+                old = self._versions.get(version)
+                if old is None:
+                    return None
+                delta = self._diffs[version] = diff_records(old, self._versions[self.latest])
+        return {"version": self.latest, "since": version, "reset": False, **delta, "order": self._order}
+
+    def stats(self):
+        return {"versions": len(self._versions), "latest": self.latest}
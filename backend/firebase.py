@@ -0,0 +1,45 @@
+"""Firebase Admin, imported and initialized on first use.
+
+Importing firebase_admin (google-auth, cryptography, requests) is a large part
+of worker start-up, and only Bearer tokens and admin actions need it. `auth()`
+imports and initializes it once per process; it is thread-safe because it is
+called from the token and admin thread pools. Under gunicorn --preload the
+modules are imported in the master (gunicorn.conf.py) and shared, while the
+app itself is initialized in each worker after the fork.
+"""
+import os
+import threading
+
+_lock = threading.Lock()
+_auth = None
+
+
+def cred_path():
+    return os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "serviceAccountKey.json")
+
+
+def configured():
+    """True if a service account key is available (cheap; imports nothing)."""
+    return os.path.exists(cred_path())
+
+
+def auth():
+    """The firebase_admin.auth module, with the default app initialized if possible."""
+    global _auth
+    if _auth is None:
+        with _lock:
+            if _auth is None:
+                import firebase_admin
+                from firebase_admin import auth as firebase_auth, credentials
+
+                try:
+                    if not firebase_admin._apps:
+                        if configured():
+                            firebase_admin.initialize_app(credentials.Certificate(cred_path()))
+                            print("Firebase Admin initialized successfully")
+                        else:
+                            print(f"Warning: {cred_path()} not found. Firebase Auth will not work.")
+                except Exception as e:
+                    print(f"Error initializing Firebase Admin: {e}")
+                _auth = firebase_auth
+    return _auth
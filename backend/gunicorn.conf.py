@@ -0,0 +1,53 @@
+"""Gunicorn settings. Workers write Prometheus samples to a shared directory
+(see metrics.py); it is emptied each time the server starts.
+
+The app is imported once in the master (preload) so static data, precompressed
+bodies and the base subnet columns are built once and shared copy-on-write;
+each worker only opens its pools and starts its refresh loops after the fork.
+Set GUNICORN_PRELOAD=0 to import the app in every worker instead.
+
+The worker count comes from WEB_CONCURRENCY (default 4), which main.py also
+reads to split the upstream rate limits between workers; don't pass -w.
+"""
+import gc
+import os
+import shutil
+import tempfile
+import time
+
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "deai-metrics"))
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") != "0"
+
+
+def on_starting(server):
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    # Firebase Admin is initialized lazily in each worker; importing it here
+    # means workers share the modules instead of each importing them.
+    import firebase_admin.auth  # noqa: F401
+
+    # Objects that exist now live for the whole process; keeping them out of
+    # the collector stops its refcount writes from un-sharing their pages.
+    gc.freeze()
+    server.log.info("Preloaded app; %d objects frozen", gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    os.environ["WORKER_FORKED_AT"] = str(time.time())
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,58 +1,178 @@
-from typing import Union
-from fastapi import FastAPI, Depends, HTTPException, status, Request
+from typing import List, Union
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Response, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import firebase_admin
-from firebase_admin import credentials, auth
 import os
 import asyncio
-import httpx
+import functools
+import orjson
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from data import subnets as static_subnets, news, research, lessons
+from refresher import Refresher
+from singleflight import SingleFlight
+from cache import TTLCache
+from snapshot import SnapshotStore
+from timeseries import TimeSeriesStore
+from subnets import base_columns, build_snapshot
+from scoring import ScoringModel
+from query import MAX_LIMIT, SubnetQuery, run_query
+from deltas import DeltaLog
+from valuation import DEFAULT_RATE, DEFAULT_YEARS, MAX_YEARS, run_valuation
+from stream import Broadcaster, frame
+import firebase
+from tokens import TokenVerifier, fetch_signing_certs
+from profiling import ProfilingMiddleware, span
+from metrics import MetricsMiddleware, cache_lookup, fallback_served, render as render_metrics, watch_loop_lag
+from responses import EncodedCache, encode, json_response
+from resample import AGGREGATES, downsample, parse_interval, to_arrays, to_rows
+from upstream import UpstreamPool
+from scheduler import UpstreamScheduler, Provider, PRIORITY_LIVE, PRIORITY_MARKETS, PRIORITY_HISTORY
 
 load_dotenv()
 
-# ─── Firebase Admin ───────────────────────────────────────────────────────────
-try:
-    if not firebase_admin._apps:
-        cred_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "serviceAccountKey.json")
-        if os.path.exists(cred_path):
-            cred = credentials.Certificate(cred_path)
-            firebase_admin.initialize_app(cred)
-            print("Firebase Admin initialized successfully")
-        else:
-            print(f"Warning: {cred_path} not found. Firebase Auth will not work.")
-except Exception as e:
-    print(f"Error initializing Firebase Admin: {e}")
+# ─── Upstream pool & background refresh ───────────────────────────────────────
+pool = UpstreamPool()
+# Provider quotas are per API key; each gunicorn worker gets an equal share.
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "4"))
+scheduler = UpstreamScheduler(pool, {
+    "coingecko": Provider("coingecko", float(os.getenv("COINGECKO_RATE_PER_MIN", "30")) / WORKERS, burst=5),
+    "taostats": Provider("taostats", float(os.getenv("TAOSTATS_RATE_PER_MIN", "60")) / WORKERS, burst=2),
+})
+refresher = Refresher()
+flight = SingleFlight()
+stream = Broadcaster(
+    queue_size=int(os.getenv("STREAM_QUEUE_SIZE", "64")),
+    max_subscribers=int(os.getenv("STREAM_MAX_SUBSCRIBERS", "5000")),
+)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    load_snapshots()
+    pool.open()
+    refresher.start()
+    stream.start()
+    lag_watch = asyncio.create_task(watch_loop_lag())
+    forked_at = os.getenv("WORKER_FORKED_AT")  # set by gunicorn.conf.py
+    if forked_at:
+        print(f"Worker {os.getpid()} ready {time.time() - float(forked_at):.3f}s after fork")
+    yield
+    lag_watch.cancel()
+    await stream.stop()
+    await refresher.stop()
+    await pool.close()
+    history.close()
+    tokens.shutdown()
+    admin_pool.shutdown(wait=False, cancel_futures=True)
+
+app = FastAPI(lifespan=lifespan)
 security = HTTPBearer()
 
 # ─── Cache ────────────────────────────────────────────────────────────────────
-_cache = {}
-
-def get_cached(key, max_age=60):
-    if key in _cache:
-        value, ts = _cache[key]
-        if (datetime.now() - ts).seconds < max_age:
-            return value
-    return None
+_cache = TTLCache(
+    max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "512")),
+    max_bytes=int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+)
 
-def set_cache(key, value):
-    _cache[key] = (value, datetime.now())
+def set_cache(key, value, ttl=60):
+    _cache.set(key, value, ttl)
+    snapshots.save(key, value, ttl)
+
+async def serve_cached(key, loader):
+    """Stale-while-revalidate read: a fresh value is returned as is; an expired one is
+    returned immediately while the refresher reloads it; only a cold key waits on `loader`."""
+    # Stale values are only served for keys the refresher will reload
+    value, fresh = _cache.lookup(key, stale_ok=key in refresher)
+    if fresh:
+        cache_lookup(key, "hit")
+        return value
+    if value is not None:
+        cache_lookup(key, "stale")
+        refresher.kick(key)
+        return value
+    cache_lookup(key, "miss")
+    return await flight.do(key, loader)
+
+# ─── Last-known-good snapshots ────────────────────────────────────────────────
+snapshots = SnapshotStore(os.getenv("SNAPSHOT_DIR", os.path.join(tempfile.gettempdir(), "deai-snapshots")))
+
+def load_snapshots():
+    """Warms the cache from disk; entries keep whatever is left of their TTL, so
+    expired ones are served stale while the refresher reloads them. Only sources
+    the refresher keeps warm are restored (e.g. not TaoStats once its key is unset)."""
+    snapshots.load()
+    count = 0
+    for key, (value, saved_at, ttl) in snapshots.items():
+        if key in refresher:
+            _cache.set(key, value, max(0, ttl - snapshots.age(key)))
+            count += 1
+    if count:
+        print(f"Loaded {count} snapshots from {snapshots.directory}")
+
+def last_known_good(key):
+    """Snapshot value for `key` to serve when a live fetch fails, or None."""
+    value = snapshots.get(key)
+    if value is not None:
+        print(f"Serving {key} snapshot ({snapshots.age(key):.0f}s old)")
+        fallback_served(key, "snapshot")
+    return value
+
+def set_data_age(response, *keys):
+    """Labels a response with the age in seconds of the oldest source it was built from."""
+    ages = [a for a in (snapshots.age(k) for k in keys) if a is not None]
+    if ages:
+        response.headers["X-Data-Age"] = str(int(max(ages)))
+
+def register_source(key, loader, ttl, on_refresh=None):
+    """Keeps `key` warm in the background; refreshes share the single-flight slot
+    with request-triggered loads of the same key. `on_refresh` runs after each one."""
+    async def refresh():
+        await flight.do(key, loader)
+        if on_refresh is not None:
+            await on_refresh()
+    refresher.register(key, refresh, ttl)
 
 # ─── Auth helpers ─────────────────────────────────────────────────────────────
+# Firebase Admin is imported and initialized on first use (see firebase.py); with a
+# service account key that happens in the background right after startup, together
+# with the signing certificate download, so workers serve before it is ready.
+def verify_id_token(token):
+    auth = firebase.auth()
+    try:
+        return auth.verify_id_token(token)
+    except auth.InvalidIdTokenError as e:
+        raise ValueError(str(e)) from e
+
+# Verified claims are cached per token until it expires; misses run off the event loop.
+tokens = TokenVerifier(verify_id_token, rejected=(ValueError,))
+
+def warm_firebase():
+    firebase.auth()
+    fetch_signing_certs()
+
+async def refresh_signing_certs():
+    await tokens.run(warm_firebase)
+
+if firebase.configured():
+    refresher.register("firebase_certs", refresh_signing_certs, 3600)
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
-        return auth.verify_id_token(credentials.credentials)
+        return await tokens.verify(credentials.credentials)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f"Invalid token: {e}")
 
+def is_admin(user):
+    return user.get("email", "").lower().endswith("@deaistrategies.io")
+
 async def require_admin(user: dict = Depends(get_current_user)):
-    email = user.get("email", "")
-    if not email.lower().endswith("@deaistrategies.io"):
+    if not is_admin(user):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required.")
     return user
 
@@ -63,10 +183,39 @@ async def get_optional_user(request: Request):
         return None
     token = auth_header.split(" ", 1)[1]
     try:
-        return auth.verify_id_token(token)
+        return await tokens.verify(token)
     except Exception:
         return None
 
+# ─── Metrics ──────────────────────────────────────────────────────────────────
+app.add_middleware(MetricsMiddleware)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text format, merged across all workers."""
+    body, content_type = await asyncio.to_thread(render_metrics)
+    return Response(content=body, media_type=content_type)
+
+# ─── Profiling ────────────────────────────────────────────────────────────────
+async def profile_allowed(headers):
+    """X-Profile is honoured only with an admin Bearer token (same rule as require_admin)."""
+    auth_header = headers.get("authorization", "")
+    if not auth_header.startswith("Bearer "):
+        return False
+    try:
+        return is_admin(await tokens.verify(auth_header.split(" ", 1)[1]))
+    except Exception:
+        return False
+
+app.add_middleware(
+    ProfilingMiddleware,
+    authorize=profile_allowed,
+    directory=os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "deai-profiles")),
+    sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+    max_files=int(os.getenv("PROFILE_MAX_FILES", "100")),
+    max_seconds=float(os.getenv("PROFILE_MAX_SECONDS", "30")),
+)
+
 # ─── CORS ─────────────────────────────────────────────────────────────────────
 app.add_middleware(
     CORSMiddleware,
@@ -78,417 +227,680 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Data-Age", "X-Subnets-Version", "X-Profile-Id", "Server-Timing"],
 )
 
 # ─── API Keys ─────────────────────────────────────────────────────────────────
 COINGECKO_API_KEY = os.getenv("COINGECKO_API_KEY", "")
-COINGECKO_BASE = "https://api.coingecko.com/api/v3"
+COINGECKO_BASE = os.getenv("COINGECKO_BASE", "https://api.coingecko.com/api/v3")
 
 TAOSTATS_API_KEY = os.getenv("TAOSTATS_API_KEY", "")
-TAOSTATS_BASE = "https://api.taostats.io/api"
+TAOSTATS_BASE = os.getenv("TAOSTATS_BASE", "https://api.taostats.io/api")
 
 # ─── CoinGecko: TAO price ──────────────────────────────────────────────────────────
+TAO_FALLBACK = {
+    "tao_price": 180.80,
+    "tao_price_btc": 0.00065,
+    "tao_price_change_24h": 0.0,
+    "market_cap": 1280000000,
+    "volume_24h": 8400000,
+}
+
 async def fetch_tao_data():
-    cached = get_cached("tao_stats", 60)
-    if cached:
-        return cached
+    return await serve_cached("tao_stats", load_tao_data)
 
+async def load_tao_data():
     headers = {}
     if COINGECKO_API_KEY:
         headers["x-cg-demo-api-key"] = COINGECKO_API_KEY
 
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(
-                f"{COINGECKO_BASE}/simple/price",
-                params={
-                    "ids": "bittensor",
-                    "vs_currencies": "usd,btc",
-                    "include_24hr_change": "true",
-                    "include_market_cap": "true",
-                    "include_24hr_vol": "true"
-                },
-                headers=headers
-            )
-            resp.raise_for_status()
-            data = resp.json().get("bittensor", {})
-            result = {
-                "tao_price": data.get("usd", 180.80),
-                "tao_price_btc": data.get("btc", 0.00065),
-                "tao_price_change_24h": round(data.get("usd_24h_change", 0), 2),
-                "market_cap": data.get("usd_market_cap", 1280000000),
-                "volume_24h": data.get("usd_24h_vol", 8400000),
-            }
-            set_cache("tao_stats", result)
-            return result
+        resp = await scheduler.get(
+            "coingecko",
+            f"{COINGECKO_BASE}/simple/price",
+            priority=PRIORITY_LIVE,
+            params={
+                "ids": "bittensor",
+                "vs_currencies": "usd,btc",
+                "include_24hr_change": "true",
+                "include_market_cap": "true",
+                "include_24hr_vol": "true"
+            },
+            headers=headers,
+            timeout=10.0,
+        )
+        resp.raise_for_status()
+        data = resp.json().get("bittensor", {})
+        result = {
+            "tao_price": data.get("usd", 180.80),
+            "tao_price_btc": data.get("btc", 0.00065),
+            "tao_price_change_24h": round(data.get("usd_24h_change", 0), 2),
+            "market_cap": data.get("usd_market_cap", 1280000000),
+            "volume_24h": data.get("usd_24h_vol", 8400000),
+        }
+        set_cache("tao_stats", result, 60)
+        return result
     except Exception as e:
         print(f"CoinGecko fetch error: {e}. Using fallback.")
-        return {
-            "tao_price": 180.80,
-            "tao_price_btc": 0.00065,
-            "tao_price_change_24h": 0.0,
-            "market_cap": 1280000000,
-            "volume_24h": 8400000,
-        }
+        snap = last_known_good("tao_stats")
+        if snap is not None:
+            return snap
+        fallback_served("tao_stats", "default")
+        return TAO_FALLBACK
 
 # ─── CoinGecko: Bittensor ecosystem alpha tokens (subnet prices) ─────────────
+NO_CG_SUBNETS = {}  # shared (never mutated) so failures don't look like new data
+CG_PAGE_SIZE = 250  # CoinGecko returns up to 250 per page
+CG_MAX_PAGES = 3    # max 3 pages = up to 750 tokens
+_cg_pages_hint = CG_MAX_PAGES  # pages seen on the last fetch; fetched speculatively in parallel
+
 async def fetch_coingecko_subnets():
+    return await serve_cached("cg_subnets", load_coingecko_subnets)
+
+async def fetch_markets_page(page, headers):
+    resp = await scheduler.get(
+        "coingecko",
+        f"{COINGECKO_BASE}/coins/markets",
+        priority=PRIORITY_MARKETS,
+        params={
+            "vs_currency": "usd",
+            "category": "bittensor-ecosystem",
+            "order": "market_cap_desc",
+            "per_page": CG_PAGE_SIZE,
+            "page": page,
+            "price_change_percentage": "24h,7d",
+            "sparkline": "false",
+        },
+        headers=headers
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+async def load_coingecko_subnets():
     """Fetch all bittensor-ecosystem alpha tokens from CoinGecko.
     Tokens use symbol pattern 'snXX' where XX is the subnet netuid.
-    Returns dict keyed by int netuid with live market data."""
-    cached = get_cached("cg_subnets", 300)  # 5-min cache
-    if cached:
-        return cached
+    Returns dict keyed by int netuid with live market data.
 
+    Pages are requested concurrently (as many as the previous fetch needed) and
+    merged in page order; pages past the first short one are cancelled."""
+    global _cg_pages_hint
     headers = {}
     if COINGECKO_API_KEY:
         headers["x-cg-demo-api-key"] = COINGECKO_API_KEY
 
     result = {}
+    tasks = {
+        page: asyncio.create_task(fetch_markets_page(page, headers))
+        for page in range(1, _cg_pages_hint + 1)
+    }
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            # Fetch all pages (CoinGecko returns up to 250 per page)
-            for page in range(1, 4):  # max 3 pages = up to 750 tokens
-                resp = await client.get(
-                    f"{COINGECKO_BASE}/coins/markets",
-                    params={
-                        "vs_currency": "usd",
-                        "category": "bittensor-ecosystem",
-                        "order": "market_cap_desc",
-                        "per_page": 250,
-                        "page": page,
-                        "price_change_percentage": "24h,7d",
-                        "sparkline": "false",
-                    },
-                    headers=headers
-                )
-                resp.raise_for_status()
-                tokens = resp.json()
-                if not tokens:
-                    break
-
-                for t in tokens:
-                    sym = (t.get("symbol") or "").lower().strip()
-                    # Extract netuid from symbol like 'sn8', 'sn64', 'sn120'
-                    if sym.startswith("sn") and sym[2:].isdigit():
-                        netuid = int(sym[2:])
-                        mc_usd = t.get("market_cap") or 0
-                        result[netuid] = {
-                            "cg_id": t.get("id"),
-                            "n": t.get("name") or f"Subnet {netuid}",
-                            "mc": round(mc_usd / 1e6, 3),          # millions USD
-                            "price_usd": t.get("current_price") or 0,
-                            "price_change_24h": round(t.get("price_change_percentage_24h_in_currency") or 0, 2),
-                            "price_change_7d": round(t.get("price_change_percentage_7d_in_currency") or 0, 2),
-                            "volume_24h": t.get("total_volume") or 0,
-                            "circulating_supply": t.get("circulating_supply") or 0,
-                            "image": t.get("image") or "",
-                            "live": True,
-                        }
-
-                if len(tokens) < 250:
-                    break  # no more pages
+        pages = 0
+        for page in range(1, CG_MAX_PAGES + 1):
+            if page not in tasks:
+                tasks[page] = asyncio.create_task(fetch_markets_page(page, headers))
+            items = await tasks[page]
+            pages = page
+            if not items:
+                break
+
+            for t in items:
+                sym = (t.get("symbol") or "").lower().strip()
+                # Extract netuid from symbol like 'sn8', 'sn64', 'sn120'
+                if sym.startswith("sn") and sym[2:].isdigit():
+                    netuid = int(sym[2:])
+                    mc_usd = t.get("market_cap") or 0
+                    result[netuid] = {
+                        "cg_id": t.get("id"),
+                        "n": t.get("name") or f"Subnet {netuid}",
+                        "mc": round(mc_usd / 1e6, 3),          # millions USD
+                        "price_usd": t.get("current_price") or 0,
+                        "price_change_24h": round(t.get("price_change_percentage_24h_in_currency") or 0, 2),
+                        "price_change_7d": round(t.get("price_change_percentage_7d_in_currency") or 0, 2),
+                        "volume_24h": t.get("total_volume") or 0,
+                        "circulating_supply": t.get("circulating_supply") or 0,
+                        "image": t.get("image") or "",
+                        "live": True,
+                    }
+
+            if len(items) < CG_PAGE_SIZE:
+                break  # no more pages
 
+        _cg_pages_hint = max(1, pages)
         print(f"CoinGecko subnets fetched: {len(result)} alpha tokens")
-        set_cache("cg_subnets", result)
+        set_cache("cg_subnets", result, 300)  # 5-min cache
         return result
     except Exception as e:
         print(f"CoinGecko subnet fetch error: {e}")
-        return {}
+        snap = last_known_good("cg_subnets")
+        if snap:
+            return snap
+        fallback_served("cg_subnets", "default")
+        return NO_CG_SUBNETS
+    finally:
+        # Drop speculative pages past the end of the list
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
 
 # ─── TaoStats: Subnet emissions & network data ─────────────────────────────
 async def fetch_subnets_taostats():
+    return await serve_cached("taostats_subnets", load_subnets_taostats)
+
+async def load_subnets_taostats():
     """Fetch live subnet stats from TaoStats API (requires TAOSTATS_API_KEY).
     Returns dict keyed by int netuid with emission/validator/miner data."""
-    cached = get_cached("taostats_subnets", 300)
-    if cached:
-        return cached
-
     if not TAOSTATS_API_KEY:
         return None  # No key — fall through to CoinGecko + static data
 
     headers = {"Authorization": f"Bearer {TAOSTATS_API_KEY}"}
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            resp = await client.get(
-                f"{TAOSTATS_BASE}/subnet/latest/v1",
-                params={"limit": 256, "order": "emission desc"},
-                headers=headers
-            )
-            resp.raise_for_status()
-            raw = resp.json()
-            subnets_raw = raw.get("data", raw) if isinstance(raw, dict) else raw
-
-            result = {}
-            for s in subnets_raw:
-                netuid = s.get("netuid") or s.get("net_uid")
-                if netuid is None:
-                    continue
-                nid = int(netuid)
-                result[nid] = {
-                    "n": s.get("name") or s.get("subnet_name") or f"Subnet {nid}",
-                    "em": round(float(s.get("emission") or s.get("emission_tao", 0)), 2),
-                    "share": round(float(s.get("emission_pct") or s.get("emission_share", 0)) * 100, 2),
-                    "validators": int(s.get("validator_count") or s.get("num_validators", 0)),
-                    "miners": int(s.get("miner_count") or s.get("num_miners", 0)),
-                    "alpha_tao": round(float(s.get("alpha_price_tao") or 0), 6),
-                }
-
-            set_cache("taostats_subnets", result)
-            print(f"TaoStats subnets fetched: {len(result)} subnets")
-            return result
+        resp = await scheduler.get(
+            "taostats",
+            f"{TAOSTATS_BASE}/subnet/latest/v1",
+            priority=PRIORITY_MARKETS,
+            params={"limit": 256, "order": "emission desc"},
+            headers=headers
+        )
+        resp.raise_for_status()
+        raw = resp.json()
+        subnets_raw = raw.get("data", raw) if isinstance(raw, dict) else raw
+
+        result = {}
+        for s in subnets_raw:
+            netuid = s.get("netuid") or s.get("net_uid")
+            if netuid is None:
+                continue
+            nid = int(netuid)
+            result[nid] = {
+                "n": s.get("name") or s.get("subnet_name") or f"Subnet {nid}",
+                "em": round(float(s.get("emission") or s.get("emission_tao", 0)), 2),
+                "share": round(float(s.get("emission_pct") or s.get("emission_share", 0)) * 100, 2),
+                "validators": int(s.get("validator_count") or s.get("num_validators", 0)),
+                "miners": int(s.get("miner_count") or s.get("num_miners", 0)),
+                "alpha_tao": round(float(s.get("alpha_price_tao") or 0), 6),
+            }
+
+        set_cache("taostats_subnets", result, 300)
+        print(f"TaoStats subnets fetched: {len(result)} subnets")
+        return result
     except Exception as e:
         print(f"TaoStats fetch error: {e}. Skipping.")
-        return None
+        return last_known_good("taostats_subnets")
+
+# ─── Merged subnet snapshot ───────────────────────────────────────────────────
+static_columns = base_columns(static_subnets)
+# Composite scores (score, liquidity, ...) are recomputed from live data on every
+# rebuild; SCORE_WEIGHTS (JSON) overrides the weights in scoring.DEFAULT_WEIGHTS.
+scoring = ScoringModel(orjson.loads(os.getenv("SCORE_WEIGHTS") or "{}"))
+_subnet_snapshot = None
+encoded = EncodedCache()  # response bodies per snapshot version
+query_results = EncodedCache(max_entries=256)  # filtered/paged bodies per (query, snapshot version)
+deltas = DeltaLog(max_versions=16)  # recent versions for ?since= polling
+
+async def current_subnet_snapshot():
+    """Latest merged snapshot; rebuilt only when one of its upstream results changed."""
+    global _subnet_snapshot
+    # Fetch all sources concurrently
+    with span("upstream"):
+        tao_data, cg, ts = await asyncio.gather(
+            fetch_tao_data(),
+            fetch_coingecko_subnets(),
+            fetch_subnets_taostats(),
+            return_exceptions=True
+        )
+    # Handle exceptions from gather
+    if isinstance(tao_data, Exception): tao_data = TAO_FALLBACK
+    if isinstance(cg, Exception): cg = NO_CG_SUBNETS
+    if isinstance(ts, Exception): ts = None
+
+    previous = snapshot = _subnet_snapshot
+    if snapshot is None or not snapshot.built_from((tao_data, cg, ts)):
+        with span("merge"):
+            snapshot = build_snapshot(static_columns, tao_data, cg, ts, scoring)
+            _subnet_snapshot = snapshot
+            deltas.push(snapshot.version, snapshot.records)
+        if previous is not None:
+            publish_ticks(previous, snapshot)
+    return snapshot
+
+def publish_ticks(previous, snapshot):
+    """Pushes what changed between two snapshots to /api/stream subscribers."""
+    if snapshot.version == previous.version:
+        return
+    stats = {k: v for k, v in snapshot.stats.items() if previous.stats.get(k) != v}
+    if stats:
+        stream.publish(frame("stats", stats, snapshot.version))
+    delta = deltas.since(previous.version)
+    if delta and (delta["added"] or delta["removed"] or delta["changed"]):
+        stream.publish(frame("subnets", delta, snapshot.version))
+
+async def refresh_subnet_snapshot():
+    await current_subnet_snapshot()
+
+register_source("tao_stats", load_tao_data, 60, on_refresh=refresh_subnet_snapshot)
+register_source("cg_subnets", load_coingecko_subnets, 300, on_refresh=refresh_subnet_snapshot)
+if TAOSTATS_API_KEY:
+    register_source("taostats_subnets", load_subnets_taostats, 300, on_refresh=refresh_subnet_snapshot)
 
 # ─── Endpoints ────────────────────────────────────────────────────────────────────
 @app.get("/api/stats")
-async def get_stats():
+async def get_stats(request: Request):
     """Public TAO market data. Also computes alpha ecosystem aggregate."""
-    data = await fetch_tao_data()
-    # Fetch CoinGecko subnets concurrently for aggregate stats
-    cg = await fetch_coingecko_subnets()
-
-    active_subnets = len([s for s in static_subnets if s.get("em", 0) > 0])
-    if cg:
-        active_subnets = len(cg)  # live count from CG
-
-    sum_alpha_mc = sum(v["mc"] for v in cg.values()) if cg else 0
-    total_mc_usd = (data["market_cap"] / 1e6) + sum_alpha_mc  # TAO + all alpha
-
-    return {
-        "tao_price": data["tao_price"],
-        "tao_price_btc": data.get("tao_price_btc", 0),
-        "market_cap": data["market_cap"],
-        "volume_24h": data["volume_24h"],
-        "tao_price_change_24h": data["tao_price_change_24h"],
-        "volume_change_24h": 0.0,
-        "active_subnets": active_subnets,
-        "sum_alpha_mc": round(sum_alpha_mc, 2),           # $M
-        "total_ecosystem_mc": round(total_mc_usd, 2),     # $M
-    }
+    snapshot = await current_subnet_snapshot()
+    enc = encoded.get("stats", snapshot.version, lambda: snapshot.stats)
+    response = json_response(request, enc)
+    set_data_age(response, "tao_stats", "cg_subnets")
+    return response
 
 @app.get("/api/subnets")
-async def get_subnets(request: Request):
+async def get_subnets(
+    request: Request,
+    cat: Union[str, None] = None,
+    ids: Union[str, None] = None,
+    min_mc: Union[float, None] = None,
+    max_mc: Union[float, None] = None,
+    min_em: Union[float, None] = None,
+    max_em: Union[float, None] = None,
+    min_score: Union[float, None] = None,
+    max_score: Union[float, None] = None,
+    sort: Union[str, None] = None,
+    order: Union[str, None] = None,
+    limit: Union[int, None] = Query(None, ge=1, le=MAX_LIMIT),
+    cursor: Union[str, None] = None,
+    fields: Union[str, None] = None,
+    since: Union[str, None] = None,
+):
     """Returns enriched subnet list. Priority: CoinGecko live > TaoStats live > static.
-    All visitors get the full list; authenticated users get the `authenticated` flag."""
-    user = await get_optional_user(request)
-    is_authenticated = user is not None
-
-    # Fetch all sources concurrently
-    tao_data, cg, ts = await asyncio.gather(
-        fetch_tao_data(),
-        fetch_coingecko_subnets(),
-        fetch_subnets_taostats(),
-        return_exceptions=True
-    )
-    # Handle exceptions from gather
-    if isinstance(tao_data, Exception): tao_data = {"tao_price": 180.80}
-    if isinstance(cg, Exception): cg = {}
-    if isinstance(ts, Exception): ts = None
-    tao_price = tao_data.get("tao_price", 180.80)
-
-    # Fallback: if TaoStats is completely missing (no API key) but we have CoinGecko data,
-    # approximate daily emissions (7200 TAO total per day) proportionally by Alpha Market Cap.
-    if not ts and cg:
-        ts = {}
-        total_cg_mc = sum(v.get("mc", 0) for v in cg.values())
-        if total_cg_mc > 0:
-            for netuid, cgd in cg.items():
-                mc = cgd.get("mc", 0)
-                share_frac = mc / total_cg_mc
-                ts[netuid] = {
-                    "em": round(7200 * share_frac, 2),
-                    "share": round(share_frac * 100, 2),
-                    "validators": 0,  # missing without real TaoStats
-                    "miners": 0,      # missing without real TaoStats
-                }
-
-    enriched = []
-    for s in static_subnets:
-        sid = s["id"]
-        cg_data = cg.get(sid, {})
-        ts_data = ts.get(sid, {}) if ts else {}
-
-        # Build merged record — CoinGecko wins for prices/market_cap, TaoStats for emissions
-        merged = dict(s)  # start from static baseline
-        merged["tao"] = tao_price
-        merged["authenticated"] = is_authenticated
-
-        # ── CoinGecko live fields (name, market cap in USD, alpha price)
-        if cg_data:
-            merged["live"] = True
-            # Convert USD price to TAO for alpha field
-            alpha_usd = cg_data.get("price_usd", 0)
-            merged["alpha"] = round(alpha_usd / tao_price, 6) if tao_price > 0 and alpha_usd > 0 else s.get("alpha", 0)
-            merged["alpha_usd"] = alpha_usd
-            merged["mc"] = cg_data["mc"]                          # real USD market cap
-            merged["price_change_24h"] = cg_data["price_change_24h"]
-            merged["price_change_7d"] = cg_data["price_change_7d"]
-            merged["volume_24h_usd"] = cg_data["volume_24h"]
-            merged["cg_image"] = cg_data["image"]
-            # Only override name if CoinGecko gives a proper one
-            cg_name = cg_data.get("n", "")
-            if cg_name and not cg_name.startswith("Subnet "):
-                merged["n"] = cg_name
+    All visitors get the full list; authenticated users get the `authenticated` flag.
+
+    With any query parameter the response is one page instead:
+    {"items", "total", "next_cursor", "version"}. `cat` and `ids` take
+    comma-separated values, min_/max_ bound mc, em and score, `sort` is any numeric
+    field (default mc, `order` desc), `fields` limits each item to those keys.
+
+    `since=<version>` (the `version` of an earlier response, also its X-Subnets-Version
+    header) returns only what changed since then: {"version", "since", "reset": false,
+    "added", "removed", "changed", "order"}, or {"version", "reset": true, "items"}
+    when that version is no longer known."""
+    with span("auth"):
+        user = await get_optional_user(request)
+    authenticated = user is not None
+    with span("snapshot"):
+        snapshot = await current_subnet_snapshot()
+    params = (cat, ids, min_mc, max_mc, min_em, max_em, min_score, max_score, sort, order, limit, cursor, fields)
+    with span("encode"):
+        if since is not None:
+            if any(p is not None for p in params):
+                raise HTTPException(status_code=400, detail="since cannot be combined with query parameters")
+            enc = query_results.get(("since", since, authenticated), snapshot.version, lambda: subnet_delta(snapshot, since, authenticated))
+        elif any(p is not None for p in params):
+            try:
+                q = SubnetQuery(
+                    snapshot.columns, cat=cat, ids=ids,
+                    ranges={"mc": (min_mc, max_mc), "em": (min_em, max_em), "score": (min_score, max_score)},
+                    sort=sort, order=order, limit=limit, cursor=cursor, fields=fields,
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            enc = query_results.get((q.key, authenticated), snapshot.version, lambda: run_query(snapshot, q, authenticated))
         else:
-            merged["live"] = bool(ts_data)
-
-        # ── TaoStats live fields (emissions, validators, miners — network data)
-        if ts_data:
-            if ts_data.get("em", 0) > 0:
-                merged["em"] = ts_data["em"]
-                merged["emission"] = ts_data["em"]
-            if ts_data.get("share", 0) > 0:
-                merged["share"] = ts_data["share"]
-            if ts_data.get("validators", 0) > 0:
-                merged["validators"] = ts_data["validators"]
-            if ts_data.get("miners", 0) > 0:
-                merged["miners"] = ts_data["miners"]
-            # If TaoStats has alpha price in TAO and no CoinGecko data
-            if not cg_data and ts_data.get("alpha_tao", 0) > 0:
-                merged["alpha"] = ts_data["alpha_tao"]
-
-        enriched.append(merged)
-
-    # Also include subnets discovered by CoinGecko that aren't in our static list
-    static_ids = {s["id"] for s in static_subnets}
-    for netuid, cg_data in cg.items():
-        if netuid not in static_ids and netuid != 0:  # skip TAO (netuid 0)
-            alpha_usd = cg_data.get("price_usd", 0)
-            enriched.append({
-                "id": netuid,
-                "n": cg_data.get("n", f"Subnet {netuid}"),
-                "cat": "Ecosystem",
-                "mc": cg_data["mc"],
-                "alpha": round(alpha_usd / tao_price, 6) if tao_price > 0 and alpha_usd > 0 else 0,
-                "alpha_usd": alpha_usd,
-                "price_change_24h": cg_data["price_change_24h"],
-                "price_change_7d": cg_data["price_change_7d"],
-                "volume_24h_usd": cg_data["volume_24h"],
-                "cg_image": cg_data["image"],
-                "tao": tao_price,
-                "live": True,
-                "authenticated": is_authenticated,
-                # Defaults for fields not in CoinGecko
-                "em": 0, "share": 0, "validators": 0, "miners": 0,
-                "pe": 0, "score": 0, "trend": "stable",
-            })
-
-    # Sort by market cap descending
-    enriched.sort(key=lambda x: x.get("mc", 0), reverse=True)
-    return enriched
+            enc = encoded.get(f"subnets_{authenticated}", snapshot.version, lambda: snapshot.views[authenticated])
+    with span("respond"):
+        response = json_response(request, enc, {"Vary": "Authorization"})
+    response.headers["X-Subnets-Version"] = snapshot.version
+    set_data_age(response, "tao_stats", "cg_subnets", "taostats_subnets")
+    return response
+
+@app.get("/api/stream")
+async def stream_ticks(request: Request):
+    """Server-sent events: `hello` (current version and stats) on connect, then
+    `stats` (changed fields only) and `subnets` (same shape as ?since=) whenever a
+    refresh changes the data. Event ids are snapshot versions, so a reconnect
+    with Last-Event-ID resumes with a delta (or a `reset` event if too old)."""
+    snapshot = await current_subnet_snapshot()
+    # Subscribed only after the await, so a failed or cancelled cold start leaves no subscriber behind
+    sub = stream.subscribe()
+    if sub is None:
+        raise HTTPException(status_code=503, detail="Too many open streams, try again later.")
+    first = [frame("hello", {"version": snapshot.version, "stats": snapshot.stats}, snapshot.version, retry_ms=5000)]
+    last_id = request.headers.get("last-event-id")
+    if last_id and last_id != snapshot.version:
+        delta = deltas.since(last_id)
+        first.append(frame("subnets", delta, snapshot.version) if delta else frame("reset", {"version": snapshot.version}))
+    return StreamingResponse(
+        stream.events(sub, first),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def subnet_delta(snapshot, since, authenticated):
+    delta = deltas.since(since) if deltas.latest == snapshot.version else None
+    if delta is None:
+        return {"version": snapshot.version, "reset": True, "items": snapshot.views[authenticated]}
+    if authenticated and delta["added"]:
+        delta = {**delta, "added": [{**r, "authenticated": True} for r in delta["added"]]}
+    return delta
+
+@app.get("/api/valuation")
+async def get_valuation(
+    request: Request,
+    rate: float = Query(DEFAULT_RATE, gt=0, le=1),
+    years: int = Query(DEFAULT_YEARS, ge=1, le=MAX_YEARS),
+    growth: float = Query(0.0, ge=-0.9, le=1),
+    price_growth: float = Query(0.0, ge=-0.9, le=1),
+):
+    """P/E, emission yield and NPV of every subnet from the live market cap,
+    emissions and alpha price (see valuation.py). `rate` is the annual discount
+    rate, `years` the horizon, `growth` / `price_growth` the annual growth of
+    emissions and of the TAO price, all as fractions (0.25 = 25%)."""
+    with span("snapshot"):
+        snapshot = await current_subnet_snapshot()
+    with span("encode"):
+        key = ("valuation", rate, years, growth, price_growth)
+        enc = query_results.get(key, snapshot.version, lambda: run_valuation(snapshot, rate, years, growth, price_growth))
+    with span("respond"):
+        response = json_response(request, enc)
+    response.headers["X-Subnets-Version"] = snapshot.version
+    set_data_age(response, "tao_stats", "cg_subnets", "taostats_subnets")
+    return response
+
+# Static content never changes within a deploy, so it is encoded and compressed once at import.
+STATIC_CONTENT = {
+    "news": encode(news).precompress(),
+    "research": encode(research).precompress(),
+    "academy": encode(lessons).precompress(),
+}
 
 @app.get("/api/news")
-async def get_news():
-    return news
+async def get_news(request: Request):
+    return json_response(request, STATIC_CONTENT["news"])
 
 @app.get("/api/research")
-async def get_research():
-    return research
+async def get_research(request: Request):
+    return json_response(request, STATIC_CONTENT["research"])
 
 @app.get("/api/academy")
-async def get_academy():
-    return lessons
-
-@app.get("/api/historical/btc")
-async def get_historical_btc(days: int = 30):
-    cache_key = f"historical_btc_{days}"
-    cached = get_cached(cache_key, 300)
-    if cached:
-        return cached
-
+async def get_academy(request: Request):
+    return json_response(request, STATIC_CONTENT["academy"])
+
+# ─── Price history (local time-series store) ──────────────────────────────────
+HISTORY_SERIES = {"tao_usd": "usd", "tao_btc": "btc"}
+HISTORY_TTL = 300             # tail top-up interval
+HISTORY_INITIAL_DAYS = 90     # fetched on first start; older windows are backfilled on demand
+HISTORY_MAX_BACKFILL_DAYS = int(os.getenv("HISTORY_MAX_BACKFILL_DAYS", "365"))  # CoinGecko demo keys stop at 365
+HISTORY_BACKFILL_RETRY = 900  # seconds before a failed backfill is tried again
+RANGE_CHUNK = 90 * 86400      # market_chart/range stays hourly for windows up to 90 days
+HISTORY_MAX_POINTS = 1000     # default cap on points returned to charts
+HISTORY_MAX_POINTS_LIMIT = 5000
+HISTORY_MAX_DAYS = 3650
+TAO_LISTED_AT = 1_677_628_800  # 2023-03-01; CoinGecko has no TAO prices before this
+history = TimeSeriesStore(os.getenv("TIMESERIES_DB", os.path.join(tempfile.gettempdir(), "deai-history.sqlite3")))
+_backfilled_from = {}         # series -> earliest start (epoch s) already fetched by this worker
+_backfill_retry_at = {}       # series -> time (epoch s) before which a failed backfill is not retried
+_backfills = set()            # running background backfill tasks
+
+async def fetch_history_range(series, start, end, newest_first=False):
+    """Fetches [start, end] (epoch seconds) from market_chart/range in RANGE_CHUNK pieces
+    and appends each piece to the local store as it arrives. Returns the number of
+    new points. Backfills go newest-first, so a refused old chunk (e.g. beyond a demo
+    key's history limit) does not lose the newer ones."""
     headers = {}
     if COINGECKO_API_KEY:
         headers["x-cg-demo-api-key"] = COINGECKO_API_KEY
 
+    chunks = []
+    if newest_first:
+        while start < end:
+            chunks.append((max(start, end - RANGE_CHUNK), end))
+            end -= RANGE_CHUNK
+    else:
+        while start < end:
+            chunks.append((start, min(end, start + RANGE_CHUNK)))
+            start += RANGE_CHUNK
+    added = 0
+    for chunk_start, chunk_stop in chunks:
+        resp = await scheduler.get(
+            "coingecko",
+            f"{COINGECKO_BASE}/coins/bittensor/market_chart/range",
+            priority=PRIORITY_HISTORY,
+            params={"vs_currency": HISTORY_SERIES[series], "from": int(chunk_start), "to": int(chunk_stop)},
+            headers=headers
+        )
+        resp.raise_for_status()
+        added += await asyncio.to_thread(history.append, series, resp.json().get("prices", []))
+    return added
+
+async def sync_history(series):
+    """Fetches only points newer than the last stored one (or the initial window)."""
+    now = time.time()
+    first, last = await asyncio.to_thread(history.bounds, series)
+    start = now - HISTORY_INITIAL_DAYS * 86400 if last is None else last / 1000 + 1
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            resp = await client.get(
-                f"{COINGECKO_BASE}/coins/bittensor/market_chart",
-                params={"vs_currency": "btc", "days": str(days), "interval": "daily" if days > 7 else "hourly"},
-                headers=headers
-            )
-            resp.raise_for_status()
-            raw = resp.json()
-            result = {
-                "data": [
-                    {"date": datetime.fromtimestamp(p[0] / 1000).strftime("%Y-%m-%d"), "value": p[1]}
-                    for p in raw.get("prices", [])
-                ]
-            }
-            set_cache(cache_key, result)
-            return result
+        added = await fetch_history_range(series, start, now)
+    except Exception as e:
+        print(f"CoinGecko history sync error ({series}): {e}")
+        return
+    if last is None:
+        _backfilled_from[series] = start
+    print(f"History {series}: {added} new points")
+
+def backfill_start(start):
+    return max(start, time.time() - HISTORY_MAX_BACKFILL_DAYS * 86400)
+
+async def backfill_history(series, start):
+    first, _ = await asyncio.to_thread(history.bounds, series)
+    if first is None or start >= first / 1000:
+        return
+    try:
+        await fetch_history_range(series, start, first / 1000, newest_first=True)
+        _backfilled_from[series] = start
     except Exception as e:
-        print(f"CoinGecko historical fetch error: {e}. Using fallback.")
-        import random
-        base = 0.00065
-        data = []
-        now = datetime.now()
-        for i in range(days):
-            date = (now - timedelta(days=days - 1 - i)).strftime("%Y-%m-%d")
-            base = max(0.0003, base + (random.random() - 0.5) * 0.00005)
-            data.append({"date": date, "value": base})
-        return {"data": data}
+        _backfill_retry_at[series] = time.time() + HISTORY_BACKFILL_RETRY
+        print(f"CoinGecko history backfill error ({series}): {e}")
+
+def start_backfill(series, start):
+    task = asyncio.ensure_future(flight.do(f"history_{series}_backfill", lambda: backfill_history(series, start)))
+    _backfills.add(task)
+    task.add_done_callback(_backfills.discard)
+
+async def history_bounds(series, start):
+    """(first, last) stored timestamps (ms) of `series`, syncing it first if nothing
+    is stored yet. When `start` reaches before what has been stored (up to
+    HISTORY_MAX_BACKFILL_DAYS back), older data is fetched in the background;
+    responses use what is stored already."""
+    key = f"history_{series}"
+    first, last = await asyncio.to_thread(history.bounds, series)
+    if first is None:
+        await flight.do(key, lambda: sync_history(series))
+        first, last = await asyncio.to_thread(history.bounds, series)
+    wanted = backfill_start(start)
+    if (
+        first is not None
+        and wanted < first / 1000 - 86400
+        and wanted < _backfilled_from.get(series, first / 1000)
+        and time.time() >= _backfill_retry_at.get(series, 0)
+    ):
+        start_backfill(series, wanted)
+    return first, last
+
+def history_span(days, start, end):
+    """(start, end) in epoch seconds, clamped to the span CoinGecko has data for
+    (listing date to now); start >= end after clamping means an empty window."""
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(status_code=400, detail="from must be earlier than to")
+    now = time.time()
+    end = now if end is None else min(end, now)
+    start = end - days * 86400 if start is None else start
+    return max(start, TAO_LISTED_AT), end
+
+def shape_history(points, interval_ms, agg, max_points, fmt, decimals=None, with_timestamp=False):
+    """Resamples stored points onto `interval_ms` with `agg`, caps them at `max_points`
+    and builds the response rows in one pass over the (bounded) result."""
+    ts, values = to_arrays(points)
+    out = downsample(ts, values, interval_ms, agg, max_points)
+    return to_rows(out, fmt, decimals, with_timestamp)
+
+def history_params(interval, agg, points):
+    try:
+        interval_ms = parse_interval(interval) if interval else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if agg not in AGGREGATES:
+        raise HTTPException(status_code=400, detail=f"agg must be one of {', '.join(AGGREGATES)}")
+    return interval_ms, min(points or HISTORY_MAX_POINTS, HISTORY_MAX_POINTS_LIMIT)
+
+history_responses = EncodedCache(max_entries=64)  # shaped rows per (series, params, window, stored span)
+
+async def cached_history(request, series, start, end, interval_ms, shape, params):
+    """Resampled history for [start, end] as a json_response (with ETag/304), or None
+    if nothing is stored in that window. The window is widened to whole
+    `interval_ms` buckets, and bodies are cached per (series, params, window) and
+    the stored span, so they are rebuilt only when a sync or backfill adds points."""
+    first, last = await history_bounds(series, start)
+    if last is None:
+        return None
+    lo, hi = int(start * 1000 // interval_ms), -int(-end * 1000 // interval_ms)
+    name = (series, interval_ms, *params, lo, hi)
+    enc = history_responses.find(name, (first, last))
+    if enc is None:
+        points = await asyncio.to_thread(history.window, series, lo * interval_ms, hi * interval_ms)
+        if not points:
+            return None
+        data = await asyncio.to_thread(shape, points)
+        enc = history_responses.get(name, (first, last), lambda: {"data": data})
+    age = int(max(0, time.time() - last / 1000))
+    return json_response(request, enc, headers={"X-Data-Age": str(age)})
+
+for _series in HISTORY_SERIES:
+    register_source(f"history_{_series}", functools.partial(sync_history, _series), HISTORY_TTL)
 
-@app.get("/api/historical/tao")
-async def get_historical_tao(days: int = 30):
-    """Real CoinGecko TAO/USD price history."""
-    cache_key = f"historical_tao_{days}"
-    cached = get_cached(cache_key, 300)
-    if cached:
+@app.get("/api/historical/btc")
+async def get_historical_btc(
+    request: Request,
+    days: int = Query(30, ge=1, le=HISTORY_MAX_DAYS),
+    start: Union[int, None] = Query(None, alias="from"),
+    end: Union[int, None] = Query(None, alias="to"),
+    points: Union[int, None] = Query(None, ge=2),
+    interval: Union[str, None] = None,
+    agg: str = "last",
+):
+    """TAO/BTC price history from the local store. `from`/`to` (epoch seconds)
+    select an explicit window instead of the last `days`; `interval` (e.g. 1h, 1d)
+    and `agg` (last/mean/ohlc) control resampling, `points` caps the result size."""
+    interval_ms, max_points = history_params(interval, agg, points)
+    start, end = history_span(days, start, end)
+    if start >= end:
+        return {"data": []}
+    if interval_ms is None:
+        interval_ms = (86400 if end - start > 7 * 86400 else 3600) * 1000
+    shape = lambda stored: shape_history(stored, interval_ms, agg, max_points, "%Y-%m-%d")
+    cached = await cached_history(request, "tao_btc", start, end, interval_ms, shape, (agg, max_points))
+    if cached is not None:
         return cached
 
-    headers = {}
-    if COINGECKO_API_KEY:
-        headers["x-cg-demo-api-key"] = COINGECKO_API_KEY
+    print("CoinGecko historical fetch error: no stored data. Using fallback.")
+    fallback_served("history_tao_btc", "synthetic")
+    import random
+    days = max(1, round((end - start) / 86400))
+    base = 0.00065
+    data = []
+    now = datetime.now()
+    for i in range(days):
+        date = (now - timedelta(days=days - 1 - i)).strftime("%Y-%m-%d")
+        base = max(0.0003, base + (random.random() - 0.5) * 0.00005)
+        data.append({"date": date, "value": base})
+    return {"data": data}
 
-    interval = "daily" if days > 1 else "hourly"
-    try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            resp = await client.get(
-                f"{COINGECKO_BASE}/coins/bittensor/market_chart",
-                params={"vs_currency": "usd", "days": str(days), "interval": interval},
-                headers=headers
-            )
-            resp.raise_for_status()
-            raw = resp.json()
-            prices = raw.get("prices", [])
-            result = {
-                "data": [
-                    {
-                        "date": datetime.fromtimestamp(p[0] / 1000).strftime(
-                            "%b %d, %H:%M" if days <= 1 else "%b %d"
-                        ),
-                        "value": round(p[1], 4),
-                        "timestamp": p[0],
-                    }
-                    for p in prices
-                ]
-            }
-            set_cache(cache_key, result)
-            return result
-    except Exception as e:
-        print(f"CoinGecko TAO/USD history error: {e}. Using fallback.")
-        import random
-        base = 180.0
-        data = []
-        now = datetime.now()
-        for i in range(days if days > 1 else 24):
-            if days <= 1:
-                d = (now - timedelta(hours=24 - i))
-                label = d.strftime("%H:%M")
-            else:
-                d = (now - timedelta(days=days - 1 - i))
-                label = d.strftime("%b %d")
-            base = max(50, base + (random.random() - 0.5) * 6)
-            data.append({"date": label, "value": round(base, 2)})
-        return {"data": data}
+@app.get("/api/historical/tao")
+async def get_historical_tao(
+    request: Request,
+    days: int = Query(30, ge=1, le=HISTORY_MAX_DAYS),
+    start: Union[int, None] = Query(None, alias="from"),
+    end: Union[int, None] = Query(None, alias="to"),
+    points: Union[int, None] = Query(None, ge=2),
+    interval: Union[str, None] = None,
+    agg: str = "last",
+):
+    """Real CoinGecko TAO/USD price history, served from the local store.
+    `from`/`to` (epoch seconds) select an explicit window instead of the last `days`;
+    `interval` (e.g. 1h, 1d) and `agg` (last/mean/ohlc) control resampling,
+    `points` caps the result size."""
+    interval_ms, max_points = history_params(interval, agg, points)
+    start, end = history_span(days, start, end)
+    if start >= end:
+        return {"data": []}
+    intraday = end - start <= 86400
+    if interval_ms is None:
+        interval_ms = (3600 if intraday else 86400) * 1000
+    fmt = "%b %d, %H:%M" if intraday or interval_ms < 86400 * 1000 else "%b %d"
+    shape = lambda stored: shape_history(stored, interval_ms, agg, max_points, fmt, decimals=4, with_timestamp=True)
+    cached = await cached_history(request, "tao_usd", start, end, interval_ms, shape, (agg, max_points, fmt))
+    if cached is not None:
+        return cached
+
+    print("CoinGecko TAO/USD history error: no stored data. Using fallback.")
+    fallback_served("history_tao_usd", "synthetic")
+    import random
+    days = max(1, round((end - start) / 86400))
+    base = 180.0
+    data = []
+    now = datetime.now()
+    for i in range(days if not intraday else 24):
+        if intraday:
+            d = (now - timedelta(hours=24 - i))
+            label = d.strftime("%H:%M")
+        else:
+            d = (now - timedelta(days=days - 1 - i))
+            label = d.strftime("%b %d")
+        base = max(50, base + (random.random() - 0.5) * 6)
+        data.append({"date": label, "value": round(base, 2)})
+    return {"data": data}
 
 # ─── Admin: Approve access request ───────────────────────────────────────────
 class ApproveRequest(BaseModel):
     email: str
 
+class BulkApproveRequest(BaseModel):
+    emails: List[str]
+
+# Firebase Admin calls are blocking HTTP requests; they run on this pool so an
+# approval batch never stalls the event loop, and never more than a few at once.
+ADMIN_POOL_SIZE = int(os.getenv("ADMIN_POOL_SIZE", "8"))
+BULK_APPROVE_MAX = 1000
+admin_pool = ThreadPoolExecutor(max_workers=ADMIN_POOL_SIZE, thread_name_prefix="firebase-admin")
+
+def approve_user(email):
+    """Creates a Firebase Auth account for `email` if needed and generates its
+    password reset link. Blocking; run it on `admin_pool`."""
+    auth = firebase.auth()
+    try:
+        # Try to get existing user first
+        user_record = auth.get_user_by_email(email)
+    except auth.UserNotFoundError:
+        # Create a new Firebase Auth user
+        user_record = auth.create_user(
+            email=email,
+            email_verified=False,
+            disabled=False,
+        )
+
+    # Generate a password reset link (expires in 24hrs — configure in Firebase Console)
+    reset_link = auth.generate_password_reset_link(email)
+    # Note: Firebase Admin SDK generates the link. For actually sending the email
+    # you need to either use the client-side sendPasswordResetEmail (which sends automatically)
+    # or use a transactional email service (SendGrid, Mailgun, etc.) with reset_link.
+    # Below we use the Firebase Admin-generated link with a simple httpx call to send it.
+    # If you use Firebase's built-in email service, you can call auth.generate_password_reset_link()
+    # and send via your own email provider.
+
+    # For now, if you have Firebase's built-in email delivery configured in Firebase Console,
+    # you can also trigger it via the client-side SDK from AdminPanel directly.
+    # This backend route returns the link so AdminPanel could email it via a 3rd-party service.
+    return user_record.uid, reset_link
+
+async def run_admin(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(admin_pool, fn, *args)
+
 @app.post("/api/admin/approve")
 async def approve_access_request(
     body: ApproveRequest,
@@ -507,80 +919,57 @@ async def approve_access_request(
         raise HTTPException(status_code=400, detail="Email is required.")
 
     try:
-        # Try to get existing user first
-        try:
-            user_record = auth.get_user_by_email(email)
-        except auth.UserNotFoundError:
-            # Create a new Firebase Auth user
-            user_record = auth.create_user(
-                email=email,
-                email_verified=False,
-                disabled=False,
-            )
-
-        # Generate a password reset link (expires in 24hrs — configure in Firebase Console)
-        reset_link = auth.generate_password_reset_link(email)
-        # Note: Firebase Admin SDK generates the link. For actually sending the email
-        # you need to either use the client-side sendPasswordResetEmail (which sends automatically)
-        # or use a transactional email service (SendGrid, Mailgun, etc.) with reset_link.
-        # Below we use the Firebase Admin-generated link with a simple httpx call to send it.
-        # If you use Firebase's built-in email service, you can call auth.generate_password_reset_link()
-        # and send via your own email provider.
-
-        # For now, if you have Firebase's built-in email delivery configured in Firebase Console,
-        # you can also trigger it via the client-side SDK from AdminPanel directly.
-        # This backend route returns the link so AdminPanel could email it via a 3rd-party service.
-
+        uid, reset_link = await run_admin(approve_user, email)
         return {
             "success": True,
             "message": f"User {email} is set up. Password reset link generated.",
-            "uid": user_record.uid,
+            "uid": uid,
             "reset_link": reset_link,  # Use this to send via your email provider
         }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to approve user: {str(e)}")
 
-@app.get("/api/historical/tao")
-async def get_historical_tao(days: int = 30):
-    cache_key = f"historical_tao_{days}"
-    cached = get_cached(cache_key, 300)
-    if cached:
-        return cached
-
-    headers = {}
-    if COINGECKO_API_KEY:
-        headers["x-cg-demo-api-key"] = COINGECKO_API_KEY
-
-    try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            resp = await client.get(
-                f"{COINGECKO_BASE}/coins/bittensor/market_chart",
-                params={"vs_currency": "usd", "days": str(days), "interval": "daily" if days > 7 else "hourly"},
-                headers=headers
-            )
-            resp.raise_for_status()
-            raw = resp.json()
-            result = {
-                "data": [
-                    {"date": datetime.fromtimestamp(p[0] / 1000).strftime("%Y-%m-%d %H:%M"), "value": p[1]}
-                    for p in raw.get("prices", [])
-                ]
-            }
-            set_cache(cache_key, result)
-            return result
-    except Exception as e:
-        print(f"CoinGecko TAO historical fetch error: {e}. Using fallback.")
-        import random
-        base = 180.0
-        data = []
-        now = datetime.now()
-        for i in range(days):
-            date = (now - timedelta(days=days - 1 - i)).strftime("%Y-%m-%d")
-            base = max(80, base + (random.random() - 0.5) * 10)
-            data.append({"date": date, "value": round(base, 2)})
-        return {"data": data}
-
+@app.post("/api/admin/approve/bulk")
+async def approve_access_requests(
+    body: BulkApproveRequest,
+    admin: dict = Depends(require_admin)
+):
+    """Approves many emails at once (same steps as /api/admin/approve, at most
+    ADMIN_POOL_SIZE in parallel). Streams newline-delimited JSON: one line per
+    email as it finishes ({"email", "success", "uid", "reset_link"} or
+    {"email", "success": false, "error"}), then {"done": true, "approved", "failed"}."""
+    emails = list(dict.fromkeys(e.lower().strip() for e in body.emails))
+    if "" in emails:
+        emails.remove("")
+    if not emails:
+        raise HTTPException(status_code=400, detail="At least one email is required.")
+    if len(emails) > BULK_APPROVE_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_APPROVE_MAX} emails per request.")
+
+    async def approve_one(email):
+        try:
+            uid, reset_link = await run_admin(approve_user, email)
+            return {"email": email, "success": True, "uid": uid, "reset_link": reset_link}
+        except Exception as e:
+            return {"email": email, "success": False, "error": str(e)}
+
+    async def results():
+        tasks = [asyncio.create_task(approve_one(email)) for email in emails]
+        approved = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                item = await next_done
+                approved += item["success"]
+                yield orjson.dumps(item) + b"\n"
+            yield orjson.dumps({"done": True, "approved": approved, "failed": len(emails) - approved}) + b"\n"
+        finally:
+            # Admin went away: approvals still queued on the pool are not started
+            for task in tasks:
+                task.cancel()
+            print(f"Bulk approval by {admin.get('email')}: {approved}/{len(emails)} approved")
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
 
 @app.get("/api/health")
 async def health():
@@ -589,4 +978,11 @@ async def health():
         "timestamp": datetime.now().isoformat(),
         "taostats": bool(TAOSTATS_API_KEY),
         "coingecko": bool(COINGECKO_API_KEY),
+        "upstream_pool": pool.stats(),
+        "upstream": scheduler.stats(),
+        "cache": _cache.stats(),
+        "snapshot_ages": snapshots.stats(),
+        "subnet_versions": deltas.stats(),
+        "stream": stream.stats(),
+        "tokens": tokens.stats(),
     }
@@ -0,0 +1,106 @@
+"""Prometheus metrics, aggregated across gunicorn workers.
+
+With PROMETHEUS_MULTIPROC_DIR set (gunicorn.conf.py does this before the
+workers fork) every worker writes its samples to that directory and
+`/metrics` merges them, so any worker can answer a scrape. Without it (a
+single `uvicorn` process) the default in-process registry is used.
+"""
+import asyncio
+import os
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import REGISTRY, multiprocess
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+UPSTREAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time to response headers, by route template.",
+    ["route", "method"], buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter("http_requests_total", "Requests by route template and status.", ["route", "method", "status"])
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds", "Upstream HTTP request latency (one attempt).",
+    ["provider"], buckets=UPSTREAM_BUCKETS,
+)
+UPSTREAM_REQUESTS = Counter(
+    "upstream_requests_total", "Upstream HTTP attempts by outcome (status code or 'error').",
+    ["provider", "outcome"],
+)
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Cache reads by key and result (hit, stale, miss).", ["key", "result"])
+FALLBACKS = Counter(
+    "fallback_served_total", "Responses built from a fallback instead of live data.",
+    ["source", "kind"],
+)
+LOOP_LAG = Histogram("event_loop_lag_seconds", "Event loop scheduling delay.", buckets=LAG_BUCKETS)
+LOOP_LAG_MAX = Gauge(
+    "event_loop_lag_max_seconds", "Latest event loop delay, max over live workers.",
+    multiprocess_mode="livemax",
+)
+
+
+def observe_upstream(provider, seconds, outcome):
+    UPSTREAM_LATENCY.labels(provider).observe(seconds)
+    UPSTREAM_REQUESTS.labels(provider, str(outcome)).inc()
+
+
+def cache_lookup(key, result):
+    CACHE_LOOKUPS.labels(key, result).inc()
+
+
+def fallback_served(source, kind):
+    FALLBACKS.labels(source, kind).inc()
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request up to its response headers, so
+    streaming responses are measured by how fast they start, not how long they stay open."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = []
+
+        async def send_timed(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+                route = getattr(scope.get("route"), "path", "unmatched")
+                REQUEST_LATENCY.labels(route, scope["method"]).observe(time.perf_counter() - start)
+                REQUESTS.labels(route, scope["method"], str(message["status"])).inc()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        except Exception:
+            if not status:
+                route = getattr(scope.get("route"), "path", "unmatched")
+                REQUESTS.labels(route, scope["method"], "500").inc()
+            raise
+
+
+async def watch_loop_lag(interval=0.5):
+    """Samples how late a sleep wakes up; run as a background task per worker."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - start - interval)
+        LOOP_LAG.observe(lag)
+        LOOP_LAG_MAX.set(lag)
+
+
+def render():
+    """(body, content type) of the current metrics, merged across workers."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,189 @@
+"""Opt-in per-request profiling.
+
+A profiled request gets a stack sampler on the event-loop thread (folded
+stacks, the input format of flamegraph.pl and speedscope) and records the
+`span()` stages it passes through. Both are written to a bounded directory
+and the spans are echoed in a Server-Timing header. Requests are profiled when
+an admin sends `X-Profile: 1`, or at random with PROFILE_SAMPLE_RATE; at most
+one at a time per worker.
+
+Samples cover everything the event loop runs while the request is in flight,
+including other requests; blocking work handed to threads shows up as span
+time, not as samples.
+"""
+import asyncio
+import contextvars
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+
+_spans = contextvars.ContextVar("profile_spans", default=None)
+
+
+@contextmanager
+def span(name):
+    """Times a stage of the current request if it is being profiled; no-op otherwise."""
+    spans = _spans.get()
+    if spans is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        spans.append((name, start, time.perf_counter()))
+
+
+class StackSampler:
+    """Samples one thread's Python stack every `interval` seconds from a helper thread
+    (intervals below the interpreter switch interval, 5ms by default, are not met)."""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def folded(self):
+        return "".join(f"{stack} {n}\n" for stack, n in self.counts.most_common())
+
+
+class ProfilingMiddleware:
+    """`authorize(request_headers) -> bool` (async) decides whether an X-Profile
+    header is honoured. A profile ends when the response is complete or after
+    `max_seconds`, so a long-lived stream (SSE, NDJSON) is only sampled at its
+    start and does not block profiling for the rest of its life."""
+
+    def __init__(self, app, authorize, directory, sample_rate=0.0, max_files=100, interval=0.005, max_seconds=30.0):
+        self.app = app
+        self.authorize = authorize
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.max_files = max_files
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self._busy = False
+
+    async def _wanted(self, scope):
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        if headers.get("x-profile") in ("1", "true"):
+            return "admin" if await self.authorize(headers) else None
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._busy:
+            await self.app(scope, receive, send)
+            return
+        # Claimed before awaiting authorize() so concurrent requests cannot both start
+        self._busy = True
+        try:
+            trigger = await self._wanted(scope)
+        except BaseException:
+            self._busy = False
+            raise
+        if trigger is None:
+            self._busy = False
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        spans = []
+        token = _spans.set(spans)
+        sampler = StackSampler(threading.get_ident(), self.interval)
+        start = time.perf_counter()
+        sampler.start()
+        finished = False
+
+        def finish(truncated=False):
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            duration = time.perf_counter() - start
+            sampler.stop()
+            self._busy = False
+            doc = {
+                "id": profile_id,
+                "trigger": trigger,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "duration_ms": round(duration * 1000, 3),
+                "truncated": truncated,
+                "samples": sum(sampler.counts.values()),
+                "interval_ms": self.interval * 1000,
+                "spans": [
+                    {"name": name, "start_ms": round((s - start) * 1000, 3), "ms": round((end - s) * 1000, 3)}
+                    for name, s, end in spans
+                ],
+            }
+            asyncio.get_running_loop().run_in_executor(None, self._write, profile_id, doc, sampler.folded())
+
+        async def send_profiled(message):
+            if message["type"] == "http.response.start":
+                timing = ", ".join(f"{name};dur={(end - s) * 1000:.2f}" for name, s, end in spans)
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile_id.encode()))
+                if timing:
+                    headers.append((b"server-timing", timing.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        timer = asyncio.get_running_loop().call_later(self.max_seconds, finish, True)
+        try:
+            await self.app(scope, receive, send_profiled)
+        finally:
+            timer.cancel()
+            _spans.reset(token)
+            finish()
+
+    def _write(self, profile_id, doc, folded):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            base = os.path.join(self.directory, profile_id)
+            with open(base + ".folded", "w") as f:
+                f.write(folded)
+            with open(base + ".json", "w") as f:
+                json.dump(doc, f, indent=2)
+            self._prune()
+        except Exception as e:
+            print(f"Profile {profile_id} write failed: {e}")
+
+    def _prune(self):
+        """Keeps the newest `max_files` profiles (each is a .json + .folded pair)."""
+        docs = sorted(n for n in os.listdir(self.directory) if n.endswith(".json"))
+        for name in docs[: max(0, len(docs) - self.max_files)]:
+            for suffix in (".json", ".folded"):
+                try:
+                    os.remove(os.path.join(self.directory, name[: -len(".json")] + suffix))
+                except OSError:
+                    pass
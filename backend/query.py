@@ -0,0 +1,123 @@
+"""Server-side filtering, sorting, pagination and projection of the subnet list.
+
+Queries run on the snapshot's columns and indexes; only the rows of the
+requested page are turned into dicts. Cursors are keyset cursors (last sort
+value + netuid), so paging stays consistent when the snapshot is rebuilt
+between pages.
+"""
+import base64
+import json
+
+import numpy as np
+
+RANGE_FIELDS = ("mc", "em", "score")
+ORDERS = ("asc", "desc")
+MAX_LIMIT = 500
+
+
+def _split(text):
+    return [part.strip() for part in text.split(",") if part.strip()] if text else []
+
+
+def encode_cursor(value, netuid):
+    raw = json.dumps([value, netuid], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, netuid = json.loads(raw)
+        return float(value), int(netuid)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+class SubnetQuery:
+    """Validated query parameters. Raises ValueError on bad input."""
+
+    __slots__ = ("cats", "ids", "ranges", "sort", "order", "limit", "cursor", "fields")
+
+    def __init__(self, columns, cat=None, ids=None, ranges=None, sort=None, order=None,
+                 limit=None, cursor=None, fields=None):
+        self.cats = tuple(sorted(set(_split(cat))))
+        try:
+            self.ids = tuple(sorted({int(i) for i in _split(ids)}))
+        except ValueError:
+            raise ValueError("ids must be a comma-separated list of netuids")
+
+        self.ranges = tuple(
+            (field, lo, hi) for field, (lo, hi) in sorted((ranges or {}).items())
+            if lo is not None or hi is not None
+        )
+        for field, _, _ in self.ranges:
+            if field not in RANGE_FIELDS:
+                raise ValueError(f"Range filters are supported on {', '.join(RANGE_FIELDS)}")
+
+        self.sort = sort or "mc"
+        if self.sort != "id" and self.sort not in columns.numeric:
+            raise ValueError(f"Cannot sort by {self.sort!r}")
+        self.order = order or "desc"
+        if self.order not in ORDERS:
+            raise ValueError("order must be asc or desc")
+
+        self.limit = min(limit or MAX_LIMIT, MAX_LIMIT)
+        self.cursor = decode_cursor(cursor) if cursor else None
+
+        self.fields = None
+        if fields:
+            known = {k for schema in columns.schemas for k in schema}
+            unknown = [f for f in _split(fields) if f not in known]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+            self.fields = tuple(sorted({"id", *_split(fields)}))
+
+    @property
+    def key(self):
+        """Hashable identity of the query, for response caching."""
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+
+def run_query(snapshot, q, authenticated=False):
+    """Returns {"items", "total", "next_cursor", "version"} for one page."""
+    cols = snapshot.columns
+    if q.ids:
+        rows = np.array(sorted(snapshot.by_id[i] for i in q.ids if i in snapshot.by_id), dtype=np.int64)
+    else:
+        rows = np.arange(len(cols), dtype=np.int64)
+    if q.cats:
+        in_cats = np.concatenate([snapshot.by_cat.get(c, rows[:0]) for c in q.cats])
+        rows = np.intersect1d(rows, in_cats)
+
+    if q.ranges and len(rows):
+        keep = np.ones(len(rows), dtype=bool)
+        for field, lo, hi in q.ranges:
+            values = cols.numeric[field][rows]
+            if lo is not None:
+                keep &= values >= lo
+            if hi is not None:
+                keep &= values <= hi
+        rows = rows[keep]
+
+    # Sort by the key, ties broken by netuid ascending in both directions
+    key = cols.column(q.sort)[rows].astype(np.float64)
+    ids = cols.ids[rows]
+    order = np.lexsort((ids, key if q.order == "asc" else -key))
+    rows, key, ids = rows[order], key[order], ids[order]
+    total = len(rows)
+
+    start = 0
+    if q.cursor is not None:
+        value, netuid = q.cursor
+        beyond = key > value if q.order == "asc" else key < value
+        after = beyond | ((key == value) & (ids > netuid))
+        start = total - int(np.count_nonzero(after))  # rows past the cursor form a suffix
+    end = min(start + q.limit, total)
+
+    items = cols.to_records(rows[start:end].tolist(), q.fields)
+    if authenticated:
+        for item in items:
+            if "authenticated" in item:
+                item["authenticated"] = True
+    next_cursor = encode_cursor(key[end - 1].item(), ids[end - 1].item()) if end < total else None
+    return {"items": items, "total": total, "next_cursor": next_cursor, "version": snapshot.version}
@@ -0,0 +1,55 @@
+"""Background refresh of upstream data ahead of cache expiry."""
+import asyncio
+
+
+class Refresher:
+    """Re-runs registered loaders ahead of their TTL so requests are always served
+    from cache. `lead` is the fraction of the TTL after which a refresh starts."""
+
+    def __init__(self, lead=0.8):
+        self.lead = lead
+        self._jobs = {}
+        self._loops = []
+        self._inflight = {}
+
+    def register(self, key, loader, ttl):
+        self._jobs[key] = (loader, ttl)
+
+    def __contains__(self, key):
+        return key in self._jobs
+
+    def kick(self, key):
+        """Start a refresh of `key` in the background unless one is already running.
+        Returns None for keys that are not registered."""
+        task = self._inflight.get(key)
+        if task is not None and not task.done():
+            return task
+        if key not in self._jobs:
+            return None
+        loader, _ = self._jobs[key]
+        task = asyncio.create_task(self._run(key, loader))
+        self._inflight[key] = task
+        return task
+
+    async def _run(self, key, loader):
+        try:
+            await loader()
+        except Exception as e:
+            print(f"Background refresh of {key} failed: {e}")
+
+    async def _loop(self, key, ttl):
+        while True:
+            await self.kick(key)
+            await asyncio.sleep(ttl * self.lead)
+
+    def start(self):
+        for key, (_, ttl) in self._jobs.items():
+            self._loops.append(asyncio.create_task(self._loop(key, ttl)))
+
+    async def stop(self):
+        tasks = self._loops + list(self._inflight.values())
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loops.clear()
+        self._inflight.clear()
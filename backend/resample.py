@@ -0,0 +1,145 @@
+"""Vectorized resampling and visual downsampling of price series.
+
+Series are a pair of NumPy arrays: `ts` (int64 epoch ms, ascending) and
+`values` (float64). `resample` buckets them onto a fixed interval with a
+last / mean / OHLC aggregate; `lttb` picks a visually faithful subset.
+"""
+import itertools
+import re
+from datetime import datetime
+
+import numpy as np
+
+AGGREGATES = ("last", "mean", "ohlc")
+
+_UNITS = {"m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+_INTERVAL_RE = re.compile(r"^(\d+)([mhdw])$")
+
+# Candidate bucket sizes when an interval has to be picked to fit a point budget
+NICE_INTERVALS = [
+    n * _UNITS[u] for n, u in [
+        (5, "m"), (15, "m"), (30, "m"), (1, "h"), (2, "h"), (4, "h"), (6, "h"), (12, "h"),
+        (1, "d"), (2, "d"), (3, "d"), (1, "w"), (2, "w"), (4, "w"),
+    ]
+]
+
+
+def parse_interval(text):
+    """'15m', '1h', '1d', '1w' -> milliseconds. Raises ValueError otherwise."""
+    m = _INTERVAL_RE.match(text.strip().lower())
+    if not m or int(m.group(1)) == 0:
+        raise ValueError(f"Invalid interval {text!r}; use e.g. 15m, 1h, 4h, 1d, 1w")
+    return int(m.group(1)) * _UNITS[m.group(2)]
+
+
+def to_arrays(points):
+    """[(ts_ms, value), ...] -> (ts, values)."""
+    if not points:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    flat = np.fromiter(itertools.chain.from_iterable(points), dtype=np.float64, count=2 * len(points))
+    arr = flat.reshape(-1, 2)
+    return arr[:, 0].astype(np.int64), arr[:, 1]
+
+
+def resample(ts, values, interval_ms, agg="last"):
+    """Buckets the series onto `interval_ms`. Returns a dict of arrays with `ts` and
+    `value`, plus `open`/`high`/`low`/`close` for agg='ohlc'. `last` keeps the
+    timestamp of each bucket's last point; `mean` and `ohlc` use the bucket start."""
+    if agg not in AGGREGATES:
+        raise ValueError(f"Invalid agg {agg!r}; use one of {', '.join(AGGREGATES)}")
+    if len(ts) == 0:
+        out = {"ts": ts, "value": values}
+        if agg == "ohlc":
+            out.update(open=values, high=values, low=values, close=values)
+        return out
+
+    bucket = ts // interval_ms
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(ts)]
+
+    if agg == "last":
+        return {"ts": ts[ends - 1], "value": values[ends - 1]}
+
+    bucket_ts = bucket[starts] * interval_ms
+    if agg == "mean":
+        return {"ts": bucket_ts, "value": np.add.reduceat(values, starts) / (ends - starts)}
+
+    close = values[ends - 1]
+    return {
+        "ts": bucket_ts,
+        "value": close,
+        "open": values[starts],
+        "high": np.maximum.reduceat(values, starts),
+        "low": np.minimum.reduceat(values, starts),
+        "close": close,
+    }
+
+
+def lttb(ts, values, threshold):
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points that keep the
+    visual shape of the series. First and last points are always kept."""
+    n = len(ts)
+    if threshold >= n or threshold < 3:
+        return np.arange(n) if threshold >= n else np.array([0, n - 1])[:threshold]
+
+    x = ts.astype(np.float64)
+    y = values
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)  # threshold - 2 inner buckets
+    # Third vertex for bucket i is the average of bucket i + 1 (the last point for the final bucket)
+    nxt = np.r_[edges[1:], n]
+    counts = np.diff(nxt)
+    cx = np.add.reduceat(x, nxt[:-1]) / counts
+    cy = np.add.reduceat(y, nxt[:-1]) / counts
+    picked = np.empty(threshold, dtype=np.int64)
+    picked[0] = 0
+    picked[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - cx[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (cy[i] - ay))
+        a = lo + int(area.argmax())
+        picked[i + 1] = a
+    return picked
+
+
+def downsample(ts, values, interval_ms, agg="last", max_points=1000):
+    """Resamples onto `interval_ms` and makes sure the result has at most
+    `max_points` points: OHLC is re-bucketed onto a coarser interval, last/mean
+    series are reduced with LTTB."""
+    out = resample(ts, values, interval_ms, agg)
+    if len(out["ts"]) <= max_points:
+        return out
+    if agg == "ohlc":
+        span = int(ts[-1] - ts[0]) + 1
+        # A span of k intervals can touch k + 1 buckets
+        coarser = next((i for i in NICE_INTERVALS if i > interval_ms and span / i <= max_points - 1), None)
+        if coarser is None:
+            coarser = -(-span // (max_points - 1))
+        return resample(ts, values, coarser, agg)
+    keep = lttb(out["ts"], out["value"], max_points)
+    return {k: v[keep] for k, v in out.items()}
+
+
+def to_rows(out, fmt, decimals=None, with_timestamp=False):
+    """Builds response rows ({"date", "value", [open, high, low, close], ["timestamp"]})
+    from a resampled series."""
+    cols = {"date": strftime_labels(out["ts"], fmt)}
+    for name in ("value", "open", "high", "low", "close"):
+        if name in out:
+            col = out[name] if decimals is None else np.round(out[name], decimals)
+            cols[name] = col.tolist()
+    if with_timestamp:
+        cols["timestamp"] = out["ts"].tolist()
+    names = list(cols)
+    return [dict(zip(names, row)) for row in zip(*cols.values())]
+
+
+def strftime_labels(ts, fmt):
+    """Formats epoch-ms timestamps with `fmt` (local time), calling strftime once
+    per distinct minute instead of once per point."""
+    if len(ts) == 0:
+        return []
+    minutes, inverse = np.unique(ts // 60_000, return_inverse=True)
+    labels = np.array([datetime.fromtimestamp(int(m) * 60).strftime(fmt) for m in minutes], dtype=object)
+    return labels[inverse.reshape(-1)].tolist()
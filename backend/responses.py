@@ -0,0 +1,122 @@
+"""Pre-serialized JSON responses with strong ETags.
+
+Bodies are encoded once per data version with orjson and reused until the
+version changes; a request whose If-None-Match matches gets a bodiless 304.
+Static bodies can also be precompressed (gzip, and brotli when installed) so
+the right encoding is picked per request without compressing anything.
+"""
+import gzip
+import hashlib
+from collections import OrderedDict
+
+import orjson
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Preferred first when the client accepts several
+CODINGS = ("br", "gzip")
+
+
+class Encoded:
+    __slots__ = ("body", "tag", "etag", "compressed")
+
+    def __init__(self, body):
+        self.body = body
+        self.tag = hashlib.blake2b(body, digest_size=12).hexdigest()
+        self.etag = f'"{self.tag}"'
+        self.compressed = {}  # coding -> bytes
+
+    def precompress(self):
+        self.compressed["gzip"] = gzip.compress(self.body, compresslevel=9, mtime=0)
+        if brotli is not None:
+            self.compressed["br"] = brotli.compress(self.body, quality=11)
+        return self
+
+
+def encode(obj):
+    return Encoded(orjson.dumps(obj))
+
+
+def accepted_codings(request: Request):
+    """Content codings the client accepts (q > 0), from Accept-Encoding."""
+    accepted = set()
+    for part in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding and q > 0:
+            accepted.add(coding.lower())
+    return accepted
+
+
+class EncodedCache:
+    """Encoded bodies keyed by (name, version); only the newest few versions are kept."""
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+
+    def find(self, name, version):
+        """The cached body for (name, version), or None."""
+        enc = self._data.get((name, version))
+        if enc is not None:
+            self._data.move_to_end((name, version))
+        return enc
+
+    def get(self, name, version, build):
+        key = (name, version)
+        enc = self._data.get(key)
+        if enc is None:
+            enc = encode(build())
+            self._data[key] = enc
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        else:
+            self._data.move_to_end(key)
+        return enc
+
+
+def etag_matches(request: Request, enc: Encoded):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison; any content-coding of the same body counts as a match
+    for tag in header.split(","):
+        tag = tag.strip().removeprefix("W/").strip('"')
+        if tag.split("-", 1)[0] == enc.tag:
+            return True
+    return False
+
+
+def json_response(request: Request, enc: Encoded, headers=None):
+    """200 with the pre-encoded body (precompressed if the client accepts it),
+    or 304 if the client already has this version."""
+    coding = None
+    if enc.compressed:
+        accepted = accepted_codings(request)
+        coding = next((c for c in CODINGS if c in enc.compressed and c in accepted), None)
+    headers = {
+        "ETag": f'"{enc.tag}-{coding}"' if coding else enc.etag,
+        "Cache-Control": "no-cache",
+        **(headers or {}),
+    }
+    if enc.compressed:
+        headers["Vary"] = ", ".join(filter(None, [headers.get("Vary"), "Accept-Encoding"]))
+    if etag_matches(request, enc):
+        return Response(status_code=304, headers=headers)
+    if coding:
+        headers["Content-Encoding"] = coding
+        return Response(content=enc.compressed[coding], media_type="application/json", headers=headers)
+    return Response(content=enc.body, media_type="application/json", headers=headers)
@@ -0,0 +1,219 @@
+"""Quota-aware scheduling of upstream requests.
+
+Each provider gets a token bucket (its quota split across gunicorn workers),
+a priority queue so live prices go out before history, a pause that honours
+`Retry-After`, and a circuit breaker that fails fast while the provider is down.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from email.utils import parsedate_to_datetime
+
+# Lower runs first
+PRIORITY_LIVE = 0
+PRIORITY_MARKETS = 1
+PRIORITY_HISTORY = 2
+
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling a provider that is rate limited or failing."""
+
+
+class CircuitOpen(UpstreamUnavailable):
+    pass
+
+
+class QueueTimeout(UpstreamUnavailable):
+    pass
+
+
+def retry_after_seconds(value, default=None):
+    """Parses a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class Provider:
+    def __init__(self, name, rate_per_min, burst, failure_threshold=5, cooldown=30.0):
+        self.name = name
+        self.rate = rate_per_min / 60.0
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._queue = []
+        self._seq = itertools.count()
+        self._pump = None
+        self.metrics = {
+            "requests": 0,
+            "ok": 0,
+            "errors": 0,
+            "throttled": 0,
+            "retries": 0,
+            "rejected": 0,
+            "queue_timeouts": 0,
+            "circuit_trips": 0,
+            "queue_wait_seconds": 0.0,
+            "latency_seconds": 0.0,
+        }
+
+    # ── Circuit breaker ──
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    def check_circuit(self):
+        state = self.state
+        if state == "open" or (state == "half_open" and self.probing):
+            self.metrics["rejected"] += 1
+            raise CircuitOpen(f"{self.name} circuit open")
+        if state == "half_open":
+            self.probing = True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.probing = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                self.metrics["circuit_trips"] += 1
+                print(f"Upstream {self.name}: circuit opened after {self.failures} failures")
+            self.opened_at = time.monotonic()
+
+    # ── Token bucket + priority queue ──
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, priority, timeout):
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), fut))
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.create_task(self._run_pump())
+        try:
+            await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            self.metrics["queue_timeouts"] += 1
+            raise QueueTimeout(f"{self.name} queue wait exceeded {timeout}s")
+
+    async def _run_pump(self):
+        while self._queue:
+            if self._queue[0][2].done():  # waiter gave up
+                heapq.heappop(self._queue)
+                continue
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            self._refill(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                heapq.heappop(self._queue)[2].set_result(None)
+            else:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def stats(self):
+        now = time.monotonic()
+        self._refill(now)
+        return {
+            **self.metrics,
+            "state": self.state,
+            "tokens": round(self.tokens, 2),
+            "rate_per_min": round(self.rate * 60, 2),
+            "queued": sum(1 for *_, f in self._queue if not f.done()),
+            "paused_for": round(max(0.0, self.paused_until - now), 1),
+        }
+
+
+class UpstreamScheduler:
+    """A retry waits for the Retry-After pause and then for a token within the same
+    `max_wait`, so only delays that leave `RETRY_MARGIN` seconds of it are retried;
+    longer ones return the 429/5xx at once."""
+
+    RETRY_MARGIN = 5.0
+
+    def __init__(self, pool, providers, max_wait=20.0, max_retries=2, max_retry_after=15.0):
+        self.pool = pool
+        self.providers = providers
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.max_retry_after = max_retry_after
+
+    async def get(self, name, url, priority=PRIORITY_MARKETS, **kwargs):
+        """GET through the provider's queue. Retries 429/5xx after their Retry-After
+        (if short enough) and returns the last response; raises UpstreamUnavailable
+        when the circuit is open or no token frees up within `max_wait`."""
+        provider = self.providers[name]
+        for attempt in range(self.max_retries + 1):
+            provider.check_circuit()
+            start = time.monotonic()
+            try:
+                await provider.acquire(priority, self.max_wait)
+            except BaseException:
+                provider.probing = False
+                raise
+            sent = time.monotonic()
+            provider.metrics["queue_wait_seconds"] += sent - start
+            provider.metrics["requests"] += 1
+            try:
+                resp = await self.pool.get(name, url, **kwargs)
+            except asyncio.CancelledError:
+                provider.probing = False
+                raise
+            except Exception:
+                provider.metrics["errors"] += 1
+                provider.record_failure()
+                raise
+            finally:
+                provider.metrics["latency_seconds"] += time.monotonic() - sent
+
+            if resp.status_code not in RETRY_STATUSES:
+                if resp.status_code >= 500:
+                    provider.metrics["errors"] += 1
+                    provider.record_failure()
+                else:
+                    provider.metrics["ok"] += 1
+                    provider.record_success()
+                return resp
+
+            if resp.status_code == 429:
+                provider.metrics["throttled"] += 1
+            else:
+                provider.metrics["errors"] += 1
+            provider.record_failure()
+            delay = retry_after_seconds(resp.headers.get("Retry-After"), default=2.0 ** attempt)
+            provider.pause(delay)
+            if attempt == self.max_retries or delay > min(self.max_retry_after, self.max_wait - self.RETRY_MARGIN):
+                return resp
+            provider.metrics["retries"] += 1
+        return resp
+
+    def stats(self):
+        return {name: p.stats() for name, p in self.providers.items()}
@@ -0,0 +1,102 @@
+"""Composite subnet scores, recomputed whenever the merged snapshot is rebuilt.
+
+Each input metric is normalized across the whole table to a percentile rank
+(0-100; rows without data for a metric get 0), and each composite is a
+weighted mean of its inputs. Composites are computed in order, so later ones
+(`fundamental`, `score`) can use earlier ones as inputs; those are used as is,
+not re-ranked.
+
+Weights come from DEFAULT_WEIGHTS, overridden per composite by the
+SCORE_WEIGHTS environment variable (JSON), e.g.
+    SCORE_WEIGHTS='{"network": {"validators": 0.7, "miners": 0.3}}'
+
+Liquidity, economic and network inputs are live (CoinGecko / TaoStats).
+Quality has no live source yet and uses the development metrics in data.py.
+"""
+import numpy as np
+
+DEFAULT_WEIGHTS = {
+    "liquidity": {"volume_24h_usd": 0.5, "turnover": 0.25, "mc": 0.25},
+    "economic": {"share": 0.4, "yield": 0.3, "price_change_7d": 0.3},
+    "network": {"validators": 0.5, "miners": 0.5},
+    "quality": {"github": 0.3, "uptime": 0.3, "testCov": 0.2, "docScore": 0.2},
+    "fundamental": {"economic": 0.4, "network": 0.3, "quality": 0.3},
+    "score": {"liquidity": 0.25, "economic": 0.25, "network": 0.25, "quality": 0.25},
+}
+COMPOSITES = tuple(DEFAULT_WEIGHTS)
+
+# Numeric subnet columns usable as inputs, plus metrics derived from them
+METRICS = (
+    "mc", "em", "share", "validators", "miners", "alpha", "volume_24h_usd",
+    "price_change_24h", "price_change_7d", "uptime", "github", "commits",
+    "contributors", "stars", "testCov", "docScore", "turnover", "yield",
+)
+SIGNED = ("price_change_24h", "price_change_7d")  # 0 means missing, negatives are data
+
+
+def percentile_rank(values, valid):
+    """Share of valid values <= each value, in percent; 0 where not valid."""
+    ranked = np.sort(values[valid])
+    if len(ranked) == 0:
+        return np.zeros(len(values))
+    pct = np.searchsorted(ranked, values, side="right") * (100 / len(ranked))
+    return np.where(valid, pct, 0.0)
+
+
+def _metric(num, name):
+    n = len(num["mc"])
+    if name == "turnover":   # 24h volume / market cap
+        den = num["mc"] * 1e6
+        return np.divide(num["volume_24h_usd"], den, out=np.zeros(n), where=den > 0)
+    if name == "yield":      # emissions per $ of market cap (same ranking as valuation's yield)
+        return np.divide(num["em"], num["mc"], out=np.zeros(n), where=num["mc"] > 0)
+    if name in num:
+        return num[name].astype(np.float64)
+    return np.zeros(n)
+
+
+class ScoringModel:
+    """Validated weights. Raises ValueError on unknown inputs or bad weights."""
+
+    def __init__(self, overrides=None):
+        overrides = overrides or {}
+        unknown = set(overrides) - set(COMPOSITES)
+        if unknown:
+            raise ValueError(f"Unknown score composites: {', '.join(sorted(unknown))}")
+        self.weights = {}
+        for name in COMPOSITES:
+            inputs = overrides.get(name, DEFAULT_WEIGHTS[name])
+            if not isinstance(inputs, dict):
+                raise ValueError(f"{name}: weights must be an object of input -> weight")
+            for field, w in inputs.items():
+                if field not in METRICS and field not in self.weights:
+                    raise ValueError(f"{name}: {field!r} is not a metric or an earlier composite")
+                if not isinstance(w, (int, float)) or w < 0:
+                    raise ValueError(f"{name}: weight of {field!r} must be a number >= 0")
+            total = sum(inputs.values())
+            if total <= 0:
+                raise ValueError(f"{name}: weights must not all be 0")
+            self.weights[name] = {field: w / total for field, w in inputs.items()}
+
+    def scores(self, columns):
+        """{composite: int64 array (0-100)} for the rows of `columns`."""
+        num = columns.numeric
+        ranks = {}
+        out = {}
+        for name, inputs in self.weights.items():
+            total = np.zeros(len(columns))
+            for field, w in inputs.items():
+                if field in out:
+                    part = out[field]
+                else:
+                    if field not in ranks:
+                        values = _metric(num, field)
+                        ranks[field] = percentile_rank(values, values != 0 if field in SIGNED else values > 0)
+                    part = ranks[field]
+                total += w * part
+            out[name] = total
+        return {name: np.rint(v).astype(np.int64) for name, v in out.items()}
+
+    def apply(self, columns):
+        """Replaces the composite columns of a freshly merged table in place."""
+        columns.numeric.update(self.scores(columns))
@@ -0,0 +1,24 @@
+"""Keyed single-flight: concurrent callers for the same key share one in-flight call."""
+import asyncio
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, fn):
+        """Runs `fn()` unless a call for `key` is already running, in which case the
+        caller waits for that call and gets its result (or exception).
+        A waiter being cancelled does not cancel the shared call."""
+        fut = self._calls.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(fn())
+            self._calls[key] = fut
+            fut.add_done_callback(lambda f: self._done(key, f))
+        return await asyncio.shield(fut)
+
+    def _done(self, key, fut):
+        if self._calls.get(key) is fut:
+            del self._calls[key]
+        if not fut.cancelled():
+            fut.exception()  # mark retrieved even if every waiter went away
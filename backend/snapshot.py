@@ -0,0 +1,97 @@
+"""On-disk last-known-good snapshots of upstream results.
+
+Every successful fetch is written to `<dir>/<key>.json.gz` (atomically, off the
+event loop). Workers load the directory at startup so a cold worker can answer
+with real data, and fetchers fall back to it when the live call fails.
+"""
+import asyncio
+import gzip
+import json
+import os
+import re
+import time
+
+
+def _filename(key):
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", key) + ".json.gz"
+
+
+class SnapshotStore:
+    def __init__(self, directory, max_files=64):
+        self.directory = directory
+        self.max_files = max_files
+        self._entries = {}  # key -> (value, saved_at, ttl)
+
+    def load(self):
+        """Reads all snapshot files. Returns the number of keys loaded."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return 0
+        for name in names:
+            if not name.endswith(".json.gz"):
+                continue
+            try:
+                with gzip.open(os.path.join(self.directory, name), "rt", encoding="utf-8") as f:
+                    doc = json.load(f)
+                value = doc["value"]
+                if doc.get("int_keys"):
+                    value = {int(k): v for k, v in value.items()}
+                self._entries[doc["key"]] = (value, doc["saved_at"], doc.get("ttl", 0))
+            except Exception as e:
+                print(f"Snapshot {name} unreadable: {e}")
+        return len(self._entries)
+
+    def items(self):
+        return self._entries.items()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        return None if entry is None else entry[0]
+
+    def age(self, key):
+        """Seconds since the value for `key` was fetched, or None."""
+        entry = self._entries.get(key)
+        return None if entry is None else max(0.0, time.time() - entry[1])
+
+    def save(self, key, value, ttl):
+        saved_at = time.time()
+        self._entries[key] = (value, saved_at, ttl)
+        if len(self._entries) > self.max_files:
+            del self._entries[min(self._entries, key=lambda k: self._entries[k][1])]
+        doc = {"key": key, "saved_at": saved_at, "ttl": ttl, "value": value}
+        if isinstance(value, dict) and value and all(isinstance(k, int) for k in value):
+            doc["int_keys"] = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write(key, doc)
+            return
+        loop.run_in_executor(None, self._write, key, doc)
+
+    def _write(self, key, doc):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, _filename(key))
+            tmp = f"{path}.{os.getpid()}.tmp"
+            data = json.dumps(doc, separators=(",", ":")).encode("utf-8")
+            with open(tmp, "wb") as f:
+                f.write(gzip.compress(data, compresslevel=6))
+            os.replace(tmp, path)
+            self._prune()
+        except Exception as e:
+            print(f"Snapshot write for {key} failed: {e}")
+
+    def _prune(self):
+        files = [os.path.join(self.directory, n) for n in os.listdir(self.directory) if n.endswith(".json.gz")]
+        if len(files) <= self.max_files:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[: len(files) - self.max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        return {key: round(self.age(key)) for key in self._entries}
@@ -0,0 +1,110 @@
+"""Server-sent event fan-out for live TAO price and subnet ticks.
+
+Every frame is encoded once and queued for all subscribers. Queues are
+bounded: a client that falls `queue_size` frames behind is dropped (it gets a
+final `dropped` event and reconnects with Last-Event-ID). One shared task
+queues heartbeat comments, so an idle connection costs a queue and a
+suspended generator, not a timer of its own.
+"""
+import asyncio
+
+import orjson
+
+HEARTBEAT = b": ping\n\n"
+
+
+def frame(event, data, event_id=None, retry_ms=None):
+    head = ""
+    if retry_ms is not None:
+        head += f"retry: {retry_ms}\n"
+    if event_id is not None:
+        head += f"id: {event_id}\n"
+    head += f"event: {event}\n"
+    return head.encode() + b"data: " + orjson.dumps(data) + b"\n\n"
+
+
+class Subscriber:
+    __slots__ = ("queue",)
+
+    def __init__(self, queue_size):
+        self.queue = asyncio.Queue(queue_size)
+
+
+class Broadcaster:
+    def __init__(self, queue_size=64, heartbeat=15, max_subscribers=5000):
+        self.queue_size = max(2, queue_size)
+        self.heartbeat = heartbeat
+        self.max_subscribers = max_subscribers
+        self._subs = set()
+        self._task = None
+        self.metrics = {"published": 0, "dropped": 0}
+
+    def subscribe(self):
+        """New subscriber, or None when the worker is at `max_subscribers`."""
+        if len(self._subs) >= self.max_subscribers:
+            return None
+        sub = Subscriber(self.queue_size)
+        self._subs.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        self._subs.discard(sub)
+
+    def publish(self, payload):
+        """Queues an encoded frame for every subscriber; never blocks."""
+        self.metrics["published"] += 1
+        for sub in list(self._subs):
+            try:
+                sub.queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                self._drop(sub)
+
+    def _drop(self, sub):
+        # Slow consumer: discard its backlog and end its stream
+        self.metrics["dropped"] += 1
+        self._end(sub, frame("dropped", {"reason": "slow consumer"}))
+
+    def _end(self, sub, last=None):
+        self._subs.discard(sub)
+        while not sub.queue.empty():
+            sub.queue.get_nowait()
+        if last is not None:
+            sub.queue.put_nowait(last)
+        sub.queue.put_nowait(None)
+
+    async def _heartbeats(self):
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            for sub in list(self._subs):
+                if sub.queue.empty():  # a busy stream needs no keep-alive
+                    sub.queue.put_nowait(HEARTBEAT)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._heartbeats())
+
+    async def stop(self):
+        """Ends every open stream so workers can shut down."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for sub in list(self._subs):
+            self._end(sub)
+
+    async def events(self, sub, first=()):
+        """Frames for one subscriber: `first`, then published frames until it is
+        dropped, the server stops, or the client goes away."""
+        try:
+            for payload in first:
+                yield payload
+            while True:
+                payload = await sub.queue.get()
+                if payload is None:
+                    return
+                yield payload
+        finally:
+            self.unsubscribe(sub)
+
+    def stats(self):
+        return {"subscribers": len(self._subs), **self.metrics}
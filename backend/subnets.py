@@ -0,0 +1,252 @@
+"""Merged subnet snapshot: static baseline + CoinGecko + TaoStats.
+
+The merge and the composite scores run once per upstream refresh (see
+`build_snapshot`), vectorized over the columnar table; request handlers only
+pick the pre-built variant for the caller.
+"""
+import hashlib
+import json
+
+import numpy as np
+
+from columns import Categorical, SubnetColumns
+
+
+class SubnetSnapshot:
+    """Immutable merged subnet list for one set of upstream results.
+
+    `columns` is the merged table (see columns.SubnetColumns), `records` its JSON
+    shape, and `by_id` / `by_cat` map a netuid to its row and a category to its
+    rows (ascending). `version` is a content hash, so it is stable across workers holding the
+    same data. `views[authenticated]` is the ready-to-serve list for each flag
+    value. Nothing here may be mutated after construction."""
+
+    __slots__ = ("version", "columns", "records", "by_id", "by_cat", "views", "stats", "sources")
+
+    def __init__(self, columns, stats, sources):
+        self.columns = columns
+        self.by_id = columns.index
+        cat = columns.categorical["cat"]
+        self.by_cat = {c: np.flatnonzero(cat.codes == i) for i, c in enumerate(cat.categories)}
+        self.records = tuple(columns.to_records())
+        self.views = {
+            False: self.records,
+            True: tuple({**r, "authenticated": True} for r in self.records),
+        }
+        self.stats = stats
+        self.sources = sources
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(json.dumps([self.records, stats], separators=(",", ":"), default=str).encode())
+        self.version = digest.hexdigest()
+
+    def built_from(self, sources):
+        """True if this snapshot was built from exactly these upstream results."""
+        return len(sources) == len(self.sources) and all(a is b for a, b in zip(sources, self.sources))
+
+
+# Keys appended to a static record by the merge, in the order they first appear
+MERGE_KEYS = ("authenticated", "live")
+CG_KEYS = MERGE_KEYS + ("alpha_usd", "price_change_24h", "price_change_7d", "volume_24h_usd", "cg_image")
+# Key order of a subnet discovered on CoinGecko but missing from the static list
+DISCOVERED_KEYS = (
+    "id", "n", "cat", "mc", "alpha", "alpha_usd", "price_change_24h", "price_change_7d",
+    "volume_24h_usd", "cg_image", "tao", "live", "authenticated",
+    "em", "share", "validators", "miners", "pe", "score",
+    "liquidity", "quality", "economic", "network", "fundamental", "trend",
+)
+# Where a row's `em` came from (the "em_source" categorical; not part of the records).
+# "estimated" is the CoinGecko-only fallback, em = 7200 × mc / Σmc, so it carries no
+# information beyond the market cap.
+EM_SOURCES = ("none", "static", "taostats", "estimated")
+CG_FIELDS = ("mc", "price_usd", "price_change_24h", "price_change_7d", "volume_24h")
+TS_FIELDS = ("em", "share", "validators", "miners", "alpha_tao")
+
+
+def base_columns(static):
+    """Columns for the static baseline. `em` is float because TaoStats reports
+    fractional emissions."""
+    return SubnetColumns.from_records(static, float_fields=("em",))
+
+
+def _source_arrays(source, fields):
+    """{netuid: {...}} -> (ids, {field: float64 array}), in dict order."""
+    rows = list(source.values())
+    n = len(rows)
+    ids = np.fromiter(source.keys(), dtype=np.int64, count=n)
+    return ids, {f: np.fromiter((r.get(f) or 0 for r in rows), dtype=np.float64, count=n) for f in fields}
+
+
+def _positions(ids, source_ids):
+    """Index of each of `ids` in `source_ids`, -1 where absent."""
+    if len(source_ids) == 0:
+        return np.full(len(ids), -1, dtype=np.int64)
+    order = np.argsort(source_ids, kind="stable")
+    found = np.minimum(np.searchsorted(source_ids[order], ids), len(order) - 1)
+    return np.where(source_ids[order][found] == ids, order[found], -1)
+
+
+def _gather(col, pos):
+    """col[pos], with 0 where pos is -1."""
+    return np.r_[col, 0][pos]
+
+
+def _alpha_tao(alpha_usd, tao_price, default):
+    if tao_price <= 0:
+        return default
+    return np.where(alpha_usd > 0, np.round(alpha_usd / tao_price, 6), default)
+
+
+def _extend(keys, extra):
+    return keys + tuple(k for k in extra if k not in keys)
+
+
+def merge_subnets(base, tao_data, cg, ts):
+    """Returns the enriched subnet table, sorted by market cap descending.
+    Priority: CoinGecko live > TaoStats live > static."""
+    tao_price = tao_data.get("tao_price", 180.80)
+    cg = cg or {}
+    cg_ids, cg_cols = _source_arrays(cg, CG_FIELDS)
+
+    # Fallback: if TaoStats is completely missing (no API key) but we have CoinGecko data,
+    # approximate daily emissions (7200 TAO total per day) proportionally by Alpha Market Cap.
+    estimated = False
+    if not ts and cg:
+        ts_ids, ts_cols = cg_ids[:0], {f: np.zeros(0) for f in TS_FIELDS}
+        total_cg_mc = cg_cols["mc"].sum()
+        if total_cg_mc > 0:
+            estimated = True
+            share_frac = cg_cols["mc"] / total_cg_mc
+            zeros = np.zeros(len(cg_ids))
+            ts_ids = cg_ids
+            ts_cols = {
+                "em": np.round(7200 * share_frac, 2),
+                "share": np.round(share_frac * 100, 2),
+                "validators": zeros,  # missing without real TaoStats
+                "miners": zeros,      # missing without real TaoStats
+                "alpha_tao": zeros,
+            }
+    else:
+        ts_ids, ts_cols = _source_arrays(ts or {}, TS_FIELDS)
+
+    n = len(base)
+    num = {k: v.copy() for k, v in base.numeric.items()}
+    for f in ("alpha_usd", "price_change_24h", "price_change_7d", "volume_24h_usd"):
+        num[f] = np.zeros(n)  # only part of the record when CoinGecko has the subnet
+    num["tao"][:] = tao_price
+    names = list(base.text["n"])
+    images = [""] * n
+
+    # ── CoinGecko live fields (name, market cap in USD, alpha price)
+    c = _positions(base.ids, cg_ids)
+    has_cg = c >= 0
+    rows, src = np.flatnonzero(has_cg), c[has_cg]
+    alpha_usd = cg_cols["price_usd"][src]
+    num["alpha"][rows] = _alpha_tao(alpha_usd, tao_price, num["alpha"][rows])
+    num["alpha_usd"][rows] = alpha_usd
+    num["mc"][rows] = cg_cols["mc"][src]
+    num["price_change_24h"][rows] = cg_cols["price_change_24h"][src]
+    num["price_change_7d"][rows] = cg_cols["price_change_7d"][src]
+    num["volume_24h_usd"][rows] = cg_cols["volume_24h"][src]
+    cg_records = list(cg.values())
+    for row, i in zip(rows.tolist(), src.tolist()):
+        images[row] = cg_records[i]["image"]
+        # Only override name if CoinGecko gives a proper one
+        cg_name = cg_records[i].get("n", "")
+        if cg_name and not cg_name.startswith("Subnet "):
+            names[row] = cg_name
+
+    # ── TaoStats live fields (emissions, validators, miners — network data)
+    t = _positions(base.ids, ts_ids)
+    live = has_cg | (t >= 0)
+    em = _gather(ts_cols["em"], t)
+    m = em > 0
+    num["em"][m] = em[m]
+    num["emission"][m] = em[m]
+    em_source = np.where(base.numeric["em"] > 0, EM_SOURCES.index("static"), EM_SOURCES.index("none"))
+    em_source[m] = EM_SOURCES.index("estimated" if estimated else "taostats")
+    for f in ("share", "validators", "miners"):
+        v = _gather(ts_cols[f], t)
+        m = v > 0
+        num[f][m] = v[m]
+    # If TaoStats has alpha price in TAO and no CoinGecko data
+    alpha_tao = _gather(ts_cols["alpha_tao"], t)
+    m = ~has_cg & (alpha_tao > 0)
+    num["alpha"][m] = alpha_tao[m]
+
+    # Also include subnets discovered by CoinGecko that aren't in our static list
+    new = np.flatnonzero(~np.isin(cg_ids, base.ids) & (cg_ids != 0))  # skip TAO (netuid 0)
+    k = len(new)
+    extra = {f: np.zeros(k, dtype=v.dtype) for f, v in num.items()}
+    extra["mc"] = cg_cols["mc"][new]
+    extra["alpha_usd"] = cg_cols["price_usd"][new]
+    extra["alpha"] = _alpha_tao(extra["alpha_usd"], tao_price, 0.0)
+    extra["price_change_24h"] = cg_cols["price_change_24h"][new]
+    extra["price_change_7d"] = cg_cols["price_change_7d"][new]
+    extra["volume_24h_usd"] = cg_cols["volume_24h"][new]
+    extra["tao"][:] = tao_price
+    new_ids = cg_ids[new]
+    for nid, i in zip(new_ids.tolist(), new.tolist()):
+        names.append(cg_records[i].get("n", f"Subnet {nid}"))
+        images.append(cg_records[i]["image"])
+
+    schemas = (
+        [_extend(s, MERGE_KEYS) for s in base.schemas]
+        + [_extend(s, CG_KEYS) for s in base.schemas]
+        + [DISCOVERED_KEYS]
+    )
+    schema_ids = np.r_[
+        np.where(has_cg, base.schema_ids + len(base.schemas), base.schema_ids),
+        np.full(k, 2 * len(base.schemas)),
+    ].astype(np.int32)
+
+    categorical = {
+        "cat": Categorical.from_values(base.categorical["cat"].tolist() + ["Ecosystem"] * k),
+        "trend": Categorical.from_values(base.categorical["trend"].tolist() + ["stable"] * k),
+        "em_source": Categorical(EM_SOURCES, np.r_[em_source, np.zeros(k, dtype=em_source.dtype)].astype(np.int32)),
+    }
+    text = {f: v + [None] * k for f, v in base.text.items()}
+    text["n"] = names
+    text["cg_image"] = images
+    merged = SubnetColumns(
+        np.r_[base.ids, new_ids],
+        {f: np.concatenate([v, extra[f]]) for f, v in num.items()},
+        categorical,
+        text,
+        {"live": np.r_[live, np.ones(k, dtype=bool)], "authenticated": np.zeros(n + k, dtype=bool)},
+        schema_ids,
+        schemas,
+    )
+
+    # Sort by market cap descending
+    return merged.take(np.argsort(-merged.numeric["mc"], kind="stable"))
+
+
+def ecosystem_stats(base, tao_data, cg):
+    """Public TAO market data plus the alpha ecosystem aggregate."""
+    active_subnets = int(np.count_nonzero(base.numeric["em"] > 0))
+    if cg:
+        active_subnets = len(cg)  # live count from CG
+
+    sum_alpha_mc = float(_source_arrays(cg, ("mc",))[1]["mc"].sum()) if cg else 0
+    total_mc_usd = (tao_data["market_cap"] / 1e6) + sum_alpha_mc  # TAO + all alpha
+
+    return {
+        "tao_price": tao_data["tao_price"],
+        "tao_price_btc": tao_data.get("tao_price_btc", 0),
+        "market_cap": tao_data["market_cap"],
+        "volume_24h": tao_data["volume_24h"],
+        "tao_price_change_24h": tao_data["tao_price_change_24h"],
+        "volume_change_24h": 0.0,
+        "active_subnets": active_subnets,
+        "sum_alpha_mc": round(sum_alpha_mc, 2),           # $M
+        "total_ecosystem_mc": round(total_mc_usd, 2),     # $M
+    }
+
+
+def build_snapshot(base, tao_data, cg, ts, scoring=None):
+    """`base` is the static baseline from `base_columns`; `scoring` (a
+    scoring.ScoringModel) recomputes the composite scores from the merged data."""
+    columns = merge_subnets(base, tao_data, cg, ts)
+    if scoring is not None:
+        scoring.apply(columns)
+    return SubnetSnapshot(columns, ecosystem_stats(base, tao_data, cg), (tao_data, cg, ts))
@@ -0,0 +1,63 @@
+"""Append-only local time-series store for price history (SQLite).
+
+Points are (series, ts, value) with `ts` in epoch milliseconds. The file is
+shared by all workers on the host (WAL mode); methods are blocking and are
+meant to be called through `asyncio.to_thread`.
+"""
+import sqlite3
+import threading
+
+
+class TimeSeriesStore:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = None
+
+    @property
+    def _conn(self):
+        # Opened on first use so the connection is never shared across a fork
+        if self._db is None:
+            db = sqlite3.connect(self.path, check_same_thread=False, timeout=10.0)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS points ("
+                " series TEXT NOT NULL, ts INTEGER NOT NULL, value REAL NOT NULL,"
+                " PRIMARY KEY (series, ts)) WITHOUT ROWID"
+            )
+            db.commit()
+            self._db = db
+        return self._db
+
+    def bounds(self, series):
+        """(first_ts, last_ts) for `series`, or (None, None) when empty."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(ts), MAX(ts) FROM points WHERE series = ?", (series,)
+            ).fetchone()
+        return row[0], row[1]
+
+    def append(self, series, points):
+        """Stores [[ts_ms, value], ...]; points already stored are left untouched."""
+        rows = [(series, int(ts), float(value)) for ts, value in points if value is not None]
+        if not rows:
+            return 0
+        with self._lock:
+            cur = self._conn.executemany("INSERT OR IGNORE INTO points VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+        return cur.rowcount
+
+    def window(self, series, start_ms, end_ms):
+        """Points with start_ms <= ts <= end_ms, oldest first, as [(ts, value), ...]."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT ts, value FROM points WHERE series = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+                (series, int(start_ms), int(end_ms)),
+            ).fetchall()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,89 @@
+"""Cached, non-blocking Firebase ID token verification.
+
+Verified claims are cached under a hash of the token until the token's `exp`,
+so a client polling with the same token is verified once per token lifetime.
+Misses run on a small thread pool (signature checks and the occasional
+certificate download must not block the event loop); concurrent misses for
+one token share a single verification, and rejected tokens are remembered
+briefly so a bad token cannot keep the pool busy.
+"""
+import asyncio
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import TTLCache
+from singleflight import SingleFlight
+
+
+class Rejected:
+    """Negative cache entry for a token the verifier rejected."""
+
+    __slots__ = ("message",)
+
+    def __init__(self, message):
+        self.message = message
+
+
+class TokenVerifier:
+    """`verify(token) -> claims` is the blocking verifier (auth.verify_id_token).
+    Exceptions of the `rejected` types are cached for `negative_ttl` seconds and
+    re-raised as a fresh ValueError with the same message; anything else (e.g. a
+    certificate fetch failure) is retried on the next call."""
+
+    def __init__(self, verify, rejected=(Exception,), max_entries=10000, negative_ttl=30, workers=4, clock=time.time):
+        self._verify = verify
+        self.rejected = rejected
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self._cache = TTLCache(max_entries=max_entries, max_bytes=32 * 1024 * 1024, stale_ttl=0)
+        self._flight = SingleFlight()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="verify-token")
+
+    async def verify(self, token):
+        """Claims for `token`; raises the verifier's exception if it is invalid."""
+        key = hashlib.sha256(token.encode()).digest()
+        cached = self._cache.get(key)
+        if cached is None:
+            return await self._flight.do(key, lambda: self._load(key, token))
+        if isinstance(cached, Rejected):
+            raise ValueError(cached.message)
+        return cached
+
+    async def _load(self, key, token):
+        loop = asyncio.get_running_loop()
+        try:
+            claims = await loop.run_in_executor(self._executor, self._verify, token)
+        except self.rejected as e:
+            # Stored as data: re-raising one exception object would keep growing
+            # its traceback (and the frames it references) on every hit
+            self._cache.set(key, Rejected(str(e)), self.negative_ttl)
+            raise
+        ttl = claims.get("exp", 0) - self.clock()
+        if ttl > 0:
+            self._cache.set(key, claims, ttl)
+        return claims
+
+    async def run(self, fn, *args):
+        """Runs a blocking call on the verification pool."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        s = self._cache.stats()
+        return {k: s[k] for k in ("entries", "hits", "misses", "evictions")}
+
+
+def fetch_signing_certs(app=None):
+    """Warms firebase_admin's cache-controlled certificate session so the first
+    verification after startup (or after Google rotates keys) does not pay for
+    the download. The session honours the certificates' max-age, so calling
+    this while they are fresh costs nothing."""
+    from firebase_admin import _token_gen, auth
+
+    verifier = auth._get_client(app)._token_verifier
+    resp = verifier.request(_token_gen.ID_TOKEN_CERT_URI)
+    if resp.status != 200:
+        raise RuntimeError(f"certificate fetch returned HTTP {resp.status}")
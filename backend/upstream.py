@@ -0,0 +1,95 @@
+"""App-scoped pooled HTTP clients for CoinGecko and TaoStats.
+
+One keep-alive client per provider, so connection limits apply per host and
+connections are reused across requests. HTTP/2 is used when `h2` is installed.
+"""
+import time
+
+import httpx
+
+from metrics import observe_upstream
+
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+# Per-provider connection limits
+LIMITS = {
+    "coingecko": httpx.Limits(max_connections=8, max_keepalive_connections=8, keepalive_expiry=60.0),
+    "taostats": httpx.Limits(max_connections=4, max_keepalive_connections=4, keepalive_expiry=60.0),
+}
+
+
+class UpstreamPool:
+    def __init__(self, limits=LIMITS, timeout=15.0, transport=None):
+        self.limits = limits
+        self.timeout = timeout
+        self.transport = transport  # replaces the network for every provider (benchmarks)
+        self._clients = {}
+        self._requests = {name: 0 for name in limits}
+        self._connects = {name: 0 for name in limits}
+        self._reused = {name: 0 for name in limits}
+        self._errors = {name: 0 for name in limits}
+
+    def open(self):
+        for name in self.limits:
+            self.client(name)
+
+    def client(self, name):
+        """Returns the shared client for `name`, creating it on first use."""
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            kwargs = {"transport": self.transport} if self.transport is not None else {}
+            client = httpx.AsyncClient(http2=HTTP2, limits=self.limits[name], timeout=self.timeout, **kwargs)
+            self._clients[name] = client
+        return client
+
+    async def close(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+    async def get(self, name, url, **kwargs):
+        connected = []
+
+        async def trace(event, info):
+            if event == "connection.connect_tcp.complete":
+                connected.append(True)
+
+        self._requests[name] += 1
+        start = time.perf_counter()
+        try:
+            resp = await self.client(name).get(url, extensions={"trace": trace}, **kwargs)
+        except Exception:
+            self._errors[name] += 1
+            observe_upstream(name, time.perf_counter() - start, "error")
+            raise
+        finally:
+            self._connects[name] += len(connected)
+        observe_upstream(name, time.perf_counter() - start, resp.status_code)
+        if not connected:
+            self._reused[name] += 1
+        return resp
+
+    def stats(self):
+        """Per-provider request/connection counters and current pool occupancy."""
+        out = {}
+        for name, limits in self.limits.items():
+            conns = []
+            client = self._clients.get(name)
+            if client is not None and not client.is_closed:
+                pool = getattr(client._transport, "_pool", None)
+                conns = list(getattr(pool, "connections", []))
+            out[name] = {
+                "http2": HTTP2,
+                "max_connections": limits.max_connections,
+                "open_connections": len(conns),
+                "idle_connections": sum(1 for c in conns if c.is_idle()),
+                "requests": self._requests[name],
+                "new_connections": self._connects[name],
+                "reused": self._reused[name],
+                "errors": self._errors[name],
+            }
+        return out
@@ -0,0 +1,93 @@
+"""Emission-based valuation of every subnet (academy module "Valuation Methods").
+
+Treats a subnet's TAO emissions as its cash flow:
+
+    annual emission value  = em × 365 × TAO price            ($M, like mc)
+    P/E                    = mc / annual emission value
+    emission yield         = annual emission value / mc      (%)
+    NPV                    = Σ_{t=1..years} E(t) × P(t) / (1 + rate)^t
+
+with E(t) and P(t) growing from today's values at `growth` and `price_growth`
+a year. The growth terms are the same for every subnet, so the NPV is the
+annual emission value times one discount factor, and the whole table is
+computed in a single pass over the snapshot's columns.
+
+Each item's `em_source` says where its emissions came from (see
+subnets.EM_SOURCES). Without TaoStats, emissions are only estimated as
+7200 × mc / Σmc, which would make every ratio the same for all subnets; those
+rows get null valuations, as do rows without emissions.
+"""
+import numpy as np
+
+DEFAULT_RATE = 0.25    # the module's 20-35% crypto risk premium
+DEFAULT_YEARS = 5
+MAX_YEARS = 50
+
+
+def discount_factor(rate, years, growth=0.0, price_growth=0.0):
+    """Σ_{t=1..years} ((1 + growth)(1 + price_growth))^(t-1) / (1 + rate)^t"""
+    t = np.arange(1, years + 1, dtype=np.float64)
+    return float(np.sum(((1 + growth) * (1 + price_growth)) ** (t - 1) / (1 + rate) ** t))
+
+
+def _ratio(num, den):
+    """num / den, NaN where den is not positive."""
+    out = np.full(len(num), np.nan)
+    np.divide(num, den, out=out, where=den > 0)
+    return out
+
+
+def _values(column, digits):
+    return [None if np.isnan(v) else v for v in np.round(column, digits).tolist()]
+
+
+def value_subnets(columns, tao_price, rate=DEFAULT_RATE, years=DEFAULT_YEARS, growth=0.0, price_growth=0.0):
+    """{field: array} over the rows of `columns`; NaN where a ratio is undefined
+    (no emissions or no market cap) and everywhere for rows whose emissions are
+    only estimated from market cap."""
+    num = columns.numeric
+    mc, alpha = num["mc"], num["alpha"]
+    usable = (num["em"] > 0) & ~columns.categorical["em_source"].mask("estimated")
+    em = np.where(usable, num["em"], np.nan)
+    annual = em * 365 * tao_price / 1e6
+    npv = annual * discount_factor(rate, years, growth, price_growth)
+    npv_mc = _ratio(npv, mc)
+    return {
+        "annual_emission": annual,
+        "pe": _ratio(mc, annual),
+        "yield": _ratio(annual, mc) * 100,
+        "npv": npv,
+        "npv_mc": npv_mc,
+        "fair_alpha": alpha * npv_mc,                # alpha price (TAO) at which mc == NPV
+        "alpha_em": _ratio(alpha, np.where(usable, num["share"], np.nan)),  # α/ε: alpha price / emission share %
+    }
+
+
+VALUE_DIGITS = {"annual_emission": 4, "pe": 4, "yield": 4, "npv": 4, "npv_mc": 4, "fair_alpha": 6, "alpha_em": 4}
+
+
+def run_valuation(snapshot, rate=DEFAULT_RATE, years=DEFAULT_YEARS, growth=0.0, price_growth=0.0):
+    """Returns {"version", "tao_price", "params", "emissions_estimated", "items"};
+    items follow the snapshot's order (market cap descending).
+    `emissions_estimated` is true when no row has independent emission data."""
+    cols = snapshot.columns
+    tao_price = float(snapshot.stats["tao_price"])
+    values = value_subnets(cols, tao_price, rate, years, growth, price_growth)
+    columns = {
+        "id": cols.ids.tolist(),
+        "n": cols.text["n"],
+        "cat": cols.categorical["cat"].tolist(),
+        "mc": cols.numeric["mc"].tolist(),
+        "em": cols.numeric["em"].tolist(),
+        "em_source": cols.categorical["em_source"].tolist(),
+        "alpha": cols.numeric["alpha"].tolist(),
+        **{f: _values(v, VALUE_DIGITS[f]) for f, v in values.items()},
+    }
+    names = list(columns)
+    return {
+        "version": snapshot.version,
+        "tao_price": tao_price,
+        "params": {"rate": rate, "years": years, "growth": growth, "price_growth": price_growth},
+        "emissions_estimated": "estimated" in columns["em_source"] and "taostats" not in columns["em_source"],
+        "items": [dict(zip(names, row)) for row in zip(*columns.values())],
+    }